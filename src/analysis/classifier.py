@@ -3,6 +3,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 from fnmatch import fnmatch
+from functools import cache
 from pathlib import Path
 
 from src.db.database import Database
@@ -158,10 +159,11 @@ def get_file_type(file_path: str | Path) -> str | None:
     return EXTENSION_TYPES.get(suffix)
 
 
-def get_parent_types(project_type: str) -> list[str]:
+@cache
+def get_parent_types(project_type: str) -> tuple[str, ...]:
     """Get the inheritance chain for a project type.
 
-    E.g., 'django' -> ['django', 'python']
+    E.g., 'django' -> ('django', 'python'). Cached, as the hierarchy is static.
     """
     types = [project_type]
     current = project_type
@@ -174,7 +176,7 @@ def get_parent_types(project_type: str) -> list[str]:
         else:
             break
 
-    return types
+    return tuple(types)
 
 
 def save_classification(db: Database, classification: ProjectClassification) -> None:
@@ -216,6 +218,13 @@ def get_classification(db: Database, project_path: str) -> ProjectClassification
     return None
 
 
+def get_project_types(db: Database) -> dict[str, str]:
+    """Get project_path -> project_type for all classified projects in one query."""
+    return dict(
+        db.fetchall("SELECT project_path, project_type FROM project_classifications")
+    )
+
+
 def classify_projects_from_conversations(db: Database) -> int:
     """Classify all projects that have conversations but no classification.
 
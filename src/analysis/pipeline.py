@@ -132,6 +132,12 @@ def run_pipeline(settings: Settings) -> PipelineResult:
         errors.append(f"Correction detection error: {e}")
         logger.error(f"  Error: {e}")
 
+    # Refresh planner statistics now that the bulk loads are done
+    try:
+        db.analyze()
+    except Exception as e:
+        logger.warning(f"  PRAGMA optimize failed: {e}")
+
     # Step 4: Extract preferences
     logger.info("Step 4: Extracting preferences...")
     try:
@@ -151,6 +157,10 @@ def run_pipeline(settings: Settings) -> PipelineResult:
             f"  Processed {reviews_processed} decisions, "
             f"{rules_approved} approved"
         )
+        if review_counts["failed"]:
+            errors.append(
+                f"Review processing error: {review_counts['failed']} review files not applied"
+            )
     except Exception as e:
         errors.append(f"Review processing error: {e}")
         logger.error(f"  Error: {e}")
@@ -1,15 +1,16 @@
 """Preference extraction from conversations and corrections."""
 
+import json
 import re
+import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Iterator
-import uuid
-import json
 
-from src.db.database import Database
-from src.analysis.corrections import DetectedCorrection
 from src.analysis.classifier import get_file_type
+from src.analysis.corrections import DetectedCorrection
+from src.db.database import Database
+from src.jsonutil import json_loads
 
 
 @dataclass
@@ -225,7 +226,7 @@ def get_preference(db: Database, file_ext: str | None, pref_key: str) -> Prefere
             category=result[2],
             preference_key=result[3],
             preference_value=result[4],
-            evidence=json.loads(result[5]) if result[5] else [],
+            evidence=json_loads(result[5]) if result[5] else [],
             occurrence_count=result[6],
             confidence=result[7],
             first_seen=result[8],
@@ -257,7 +258,7 @@ def get_preferences_by_file_type(db: Database, file_ext: str) -> list[Preference
                 category=row[2],
                 preference_key=row[3],
                 preference_value=row[4],
-                evidence=json.loads(row[5]) if row[5] else [],
+                evidence=json_loads(row[5]) if row[5] else [],
                 occurrence_count=row[6],
                 confidence=row[7],
                 first_seen=row[8],
@@ -293,7 +294,7 @@ def get_high_confidence_preferences(
                 category=row[2],
                 preference_key=row[3],
                 preference_value=row[4],
-                evidence=json.loads(row[5]) if row[5] else [],
+                evidence=json_loads(row[5]) if row[5] else [],
                 occurrence_count=row[6],
                 confidence=row[7],
                 first_seen=row[8],
@@ -2,16 +2,35 @@
 
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from collections import defaultdict
+from typing import Any
 
 import httpx
 from dotenv import load_dotenv
 
 from src.db.database import Database
 
-load_dotenv(Path(__file__).parent.parent.parent / ".env")
+# .env is only read when the key is missing from the environment
+_ENV_PATH = Path(__file__).parent.parent.parent / ".env"
+
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+
+# Longest user message sent to the LLM or stored as evidence
+MAX_MESSAGE_CHARS = 300
+
+# Shared client: keep-alive + HTTP/2 avoid a TLS handshake per request
+_client = httpx.Client(
+    http2=True,
+    timeout=30.0,
+    headers={
+        "anthropic-version": "2023-06-01",
+        "content-type": "application/json",
+    },
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
 
 
 @dataclass
@@ -56,32 +75,107 @@ If the messages don't contain a generalizable rule, respond:
 {"rule": null, "reasoning": "explanation"}
 """
 
+# Output budget per group in a bulk call (same as a single-rule call)
+MAX_TOKENS_PER_GROUP = 512
+
+# Tool used to force structured output when refining many groups per call
+BULK_REFINEMENT_TOOL: dict[str, Any] = {
+    "name": "record_rules",
+    "description": "Record the refined rule for every numbered item in the prompt.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "rules": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "rule": {"type": ["string", "null"]},
+                        "category": {"type": "string"},
+                        "file_types": {"type": "array", "items": {"type": "string"}},
+                        "is_global": {"type": "boolean"},
+                        "confidence": {"type": "number"},
+                        "reasoning": {"type": "string"},
+                    },
+                    "required": ["id", "rule"],
+                },
+            },
+        },
+        "required": ["rules"],
+    },
+}
+
 
-def call_anthropic(prompt: str) -> str:
-    """Call Anthropic API."""
+def get_api_key() -> str:
+    """Get the Anthropic API key, loading .env only if it is not set."""
     api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        load_dotenv(_ENV_PATH)
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY not set")
+    return api_key
 
-    response = httpx.post(
-        "https://api.anthropic.com/v1/messages",
-        headers={
-            "x-api-key": api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json",
-        },
+
+def call_anthropic(prompt: str) -> str:
+    """Call Anthropic API."""
+    api_key = get_api_key()
+
+    response = _client.post(
+        ANTHROPIC_MESSAGES_URL,
+        headers={"x-api-key": api_key},
         json={
             "model": "claude-haiku-4-5-20251001",
             "max_tokens": 512,
             "system": REFINEMENT_PROMPT,
             "messages": [{"role": "user", "content": prompt}],
         },
-        timeout=30.0,
     )
     response.raise_for_status()
     return response.json()["content"][0]["text"]
 
 
+class TruncatedResponseError(Exception):
+    """The model hit max_tokens before finishing its answer."""
+
+
+def call_anthropic_tool(
+    prompt: str,
+    tool: dict[str, Any],
+    max_tokens: int = 4096,
+) -> dict[str, Any]:
+    """Call Anthropic API, forcing a single tool call, and return its input.
+
+    Raises TruncatedResponseError if the output hit max_tokens, since the
+    tool input is then incomplete.
+    """
+    api_key = get_api_key()
+
+    response = _client.post(
+        ANTHROPIC_MESSAGES_URL,
+        headers={"x-api-key": api_key},
+        json={
+            "model": "claude-haiku-4-5-20251001",
+            "max_tokens": max_tokens,
+            "system": REFINEMENT_PROMPT,
+            "tools": [tool],
+            "tool_choice": {"type": "tool", "name": tool["name"]},
+            "messages": [{"role": "user", "content": prompt}],
+        },
+        timeout=60.0,
+    )
+    response.raise_for_status()
+    data = response.json()
+    if data.get("stop_reason") == "max_tokens":
+        raise TruncatedResponseError(f"Response truncated at {max_tokens} tokens")
+    for block in data["content"]:
+        if block.get("type") == "tool_use":
+            tool_input: dict[str, Any] = block["input"]
+            return tool_input
+    raise ValueError("No tool_use block in response")
+
+
 def get_project_name(project_path: str) -> str:
     """Extract meaningful project name from path."""
     if not project_path:
@@ -136,7 +230,7 @@ def refine_rule_group(
     messages = []
     for c in corrections:
         msg = c.get("user_message", c.get("extracted_rule", ""))
-        if msg:
+        if msg and msg not in messages:
             messages.append(msg)
 
     if not messages:
@@ -147,7 +241,7 @@ def refine_rule_group(
     prompt = f"""Project: {project_name}
 
 User messages to analyze:
-{chr(10).join(f'- "{m[:300]}"' for m in messages)}
+{chr(10).join(f'- "{m}"' for m in messages)}
 
 Extract the generalizable rule from these messages."""
 
@@ -162,25 +256,125 @@ Extract the generalizable rule from these messages."""
             response = response.split("```")[1].split("```")[0]
 
         data = json.loads(response.strip())
-
-        if not data.get("rule"):
-            return None
-
-        return RefinedRule(
-            rule_text=data["rule"],
-            original_messages=messages,
-            file_types=data.get("file_types", []),
-            project_scope=None if data.get("is_global", True) else project_path,
-            confidence=data.get("confidence", 0.7),
-            occurrence_count=len(corrections),
-            category=data.get("category", "workflow"),
-        )
+        return build_refined_rule(data, messages, corrections, project_path)
 
     except Exception as e:
         print(f"Error refining rule: {e}")
         return None
 
 
+def build_refined_rule(
+    data: dict[str, Any],
+    messages: list[str],
+    corrections: list[dict[str, Any]],
+    project_path: str | None,
+) -> RefinedRule | None:
+    """Build a RefinedRule from the LLM's JSON answer for one group."""
+    if not data.get("rule"):
+        return None
+
+    return RefinedRule(
+        rule_text=data["rule"],
+        original_messages=messages,
+        file_types=data.get("file_types", []),
+        project_scope=None if data.get("is_global", True) else project_path,
+        confidence=data.get("confidence", 0.7),
+        occurrence_count=len(corrections),
+        category=data.get("category", "workflow"),
+    )
+
+
+def refine_chunk(groups: list[list[dict[str, Any]]]) -> list[RefinedRule]:
+    """Refine a chunk of correction groups with a single API call.
+
+    If the answer is truncated, the chunk is split in half and retried;
+    a single group that still truncates goes through refine_rule_group.
+    """
+    # Number the non-empty groups in this chunk
+    items: dict[int, tuple[list[dict[str, Any]], list[str], str | None]] = {}
+    sections = []
+    for group in groups:
+        messages = []
+        for c in group:
+            msg = c.get("user_message", c.get("extracted_rule", ""))
+            if msg and msg not in messages:
+                messages.append(msg)
+
+        if not messages:
+            continue
+
+        item_id = len(items) + 1
+        project_path = group[0].get("project_path")
+        project_name = get_project_name(project_path) if project_path else "global"
+        items[item_id] = (group, messages, project_path)
+        sections.append(
+            f"#{item_id}\nProject: {project_name}\nUser messages to analyze:\n"
+            + "\n".join(f'- "{m}"' for m in messages)
+        )
+
+    if not items:
+        return []
+
+    prompt = (
+        "Each numbered item below is a separate group of user messages. "
+        "For each item, extract the generalizable rule and record it with "
+        "the item's number as its id. Use rule null when an item has no "
+        "generalizable rule.\n\n" + "\n\n".join(sections)
+    )
+
+    try:
+        result = call_anthropic_tool(
+            prompt, BULK_REFINEMENT_TOOL, max_tokens=MAX_TOKENS_PER_GROUP * len(items)
+        )
+    except TruncatedResponseError:
+        if len(groups) == 1:
+            # Fall back to the single-group prompt, which answers in plain JSON
+            group = groups[0]
+            rule = refine_rule_group(group, group[0].get("project_path"))
+            return [rule] if rule else []
+        half = len(groups) // 2
+        return refine_chunk(groups[:half]) + refine_chunk(groups[half:])
+    except Exception as e:
+        print(f"Error refining rules: {e}")
+        return []
+
+    refined_rules = []
+    for data in result.get("rules", []):
+        item = items.get(data.get("id"))
+        if item is None:
+            continue
+        group, messages, project_path = item
+        rule = build_refined_rule(data, messages, group, project_path)
+        if rule:
+            refined_rules.append(rule)
+
+    return refined_rules
+
+
+def refine_groups_bulk(
+    groups: list[list[dict[str, Any]]],
+    k: int = 20,
+    max_workers: int = 8,
+) -> list[RefinedRule]:
+    """Refine many correction groups per API call.
+
+    Packs up to k groups into one numbered prompt so the per-request
+    overhead (round trip, system prompt) is paid once per k groups, and
+    keeps up to max_workers of those calls in flight on the shared client.
+    Returns list of refined rules.
+    """
+    chunks = [groups[i : i + k] for i in range(0, len(groups), k)]
+    if not chunks:
+        return []
+
+    refined_rules: list[RefinedRule] = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        for chunk_rules in executor.map(refine_chunk, chunks):
+            refined_rules.extend(chunk_rules)
+
+    return refined_rules
+
+
 def refine_corrections(db: Database) -> list[RefinedRule]:
     """Refine all unprocessed corrections into rules.
 
@@ -202,14 +396,15 @@ def refine_corrections(db: Database) -> list[RefinedRule]:
     if not corrections:
         return []
 
-    # Convert to dicts
+    # Convert to dicts, truncating messages once so the prompt and the
+    # stored evidence both use the same trimmed text
     correction_dicts = [
         {
             "id": c[0],
             "extracted_rule": c[1],
             "correction_type": c[2],
             "confidence": c[3],
-            "user_message": c[4],
+            "user_message": (c[4] or "")[:MAX_MESSAGE_CHARS],
             "project_path": c[5],
         }
         for c in corrections
@@ -218,18 +413,8 @@ def refine_corrections(db: Database) -> list[RefinedRule]:
     # Group similar corrections
     groups = group_by_similarity(correction_dicts)
 
-    # Refine each group
-    refined_rules = []
-    for group in groups:
-        if not group:
-            continue
-
-        project_path = group[0].get("project_path")
-        rule = refine_rule_group(group, project_path)
-        if rule:
-            refined_rules.append(rule)
-
-    return refined_rules
+    # Refine groups in bulk, many per API call
+    return refine_groups_bulk([group for group in groups if group])
 
 
 def save_refined_rules(db: Database, rules: list[RefinedRule]) -> int:
@@ -280,7 +465,7 @@ def save_refined_rules(db: Database, rules: list[RefinedRule]) -> int:
                 (
                     evidence_id,
                     review_id,
-                    msg[:500],  # Truncate long messages
+                    msg[:MAX_MESSAGE_CHARS],  # Truncate long messages
                     rule.category,
                 ),
             )
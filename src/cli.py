@@ -5,9 +5,6 @@ import logging
 import sys
 from pathlib import Path
 
-from src.config import get_settings
-from src.analysis.pipeline import run_pipeline
-
 
 def setup_logging(verbose: bool = False) -> None:
     """Configure logging."""
@@ -21,6 +18,9 @@ def setup_logging(verbose: bool = False) -> None:
 
 def cmd_run(args: argparse.Namespace) -> int:
     """Run the analysis pipeline."""
+    from src.config import get_settings
+    from src.analysis.pipeline import run_pipeline
+
     config_path = Path(args.config) if args.config else None
     settings = get_settings(config_path)
 
@@ -53,6 +53,7 @@ def cmd_run(args: argparse.Namespace) -> int:
 
 def cmd_init(args: argparse.Namespace) -> int:
     """Initialize the database."""
+    from src.config import get_settings
     from src.db.database import get_database
 
     config_path = Path(args.config) if args.config else None
@@ -67,6 +68,7 @@ def cmd_init(args: argparse.Namespace) -> int:
 
 def cmd_stats(args: argparse.Namespace) -> int:
     """Show statistics."""
+    from src.config import get_settings
     from src.db.database import get_database
 
     config_path = Path(args.config) if args.config else None
@@ -74,12 +76,17 @@ def cmd_stats(args: argparse.Namespace) -> int:
 
     db = get_database(settings.database.path)
 
-    conversations = db.fetchone("SELECT COUNT(*) FROM conversations")[0]
-    messages = db.fetchone("SELECT COUNT(*) FROM messages")[0]
-    corrections = db.fetchone("SELECT COUNT(*) FROM corrections")[0]
-    preferences = db.fetchone("SELECT COUNT(*) FROM file_type_preferences")[0]
-    rules = db.fetchone("SELECT COUNT(*) FROM learned_rules WHERE active = 1")[0]
-    pending = db.fetchone("SELECT COUNT(*) FROM review_queue WHERE status = 'pending'")[0]
+    # All counts in one round trip
+    conversations, messages, corrections, preferences, rules, pending = db.fetchone(
+        """
+        SELECT (SELECT COUNT(*) FROM conversations),
+               (SELECT COUNT(*) FROM messages),
+               (SELECT COUNT(*) FROM corrections),
+               (SELECT COUNT(*) FROM file_type_preferences),
+               (SELECT COUNT(*) FROM learned_rules WHERE active = 1),
+               (SELECT COUNT(*) FROM review_queue WHERE status = 'pending')
+        """
+    )
 
     print("Claude Reinforcement - Statistics")
     print("=" * 40)
@@ -95,6 +102,7 @@ def cmd_stats(args: argparse.Namespace) -> int:
 
 def cmd_extract(args: argparse.Namespace) -> int:
     """Extract preferences using LLM."""
+    from src.config import get_settings
     from src.db.database import get_database
     from src.analysis.llm_extractor import (
         extract_preferences_from_db,
@@ -124,9 +132,13 @@ def cmd_extract(args: argparse.Namespace) -> int:
         limit=limit,
     )
 
-    print(f"\nExtracted {len(preferences)} preferences:")
+    lines = [f"\nExtracted {len(preferences)} preferences:"]
     for pref in preferences:
-        print(f"  [{pref.preference_type}] {pref.preference_text} (confidence: {pref.confidence:.2f})")
+        lines.append(
+            f"  [{pref.preference_type}] {pref.preference_text} "
+            f"(confidence: {pref.confidence:.2f})"
+        )
+    print("\n".join(lines))
 
     if preferences and not args.dry_run:
         saved = save_extracted_preferences(db, preferences)
@@ -139,6 +151,7 @@ def cmd_extract(args: argparse.Namespace) -> int:
 
 def cmd_summarize(args: argparse.Namespace) -> int:
     """Summarize conversations to extract preferences."""
+    from src.config import get_settings
     from src.db.database import get_database
     from src.analysis.conversation_summarizer import (
         summarize_all_conversations,
@@ -156,21 +169,22 @@ def cmd_summarize(args: argparse.Namespace) -> int:
 
     summaries = list(summarize_all_conversations(db, limit=args.limit))
 
-    print(f"\nFound preferences in {len(summaries)} conversations:")
+    lines = [f"\nFound preferences in {len(summaries)} conversations:"]
     total_prefs = 0
     total_corrs = 0
 
     for summary in summaries:
         if summary.preferences or summary.corrections:
-            print(f"\n[{summary.project_name}] {summary.goal[:60]}...")
+            lines.append(f"\n[{summary.project_name}] {summary.goal[:60]}...")
             for pref in summary.preferences:
-                print(f"  + [{pref.get('category', '?')}] {pref.get('rule', '')[:50]}")
+                lines.append(f"  + [{pref.get('category', '?')}] {pref.get('rule', '')[:50]}")
                 total_prefs += 1
             for corr in summary.corrections:
-                print(f"  ! [correction] {corr.get('rule', '')[:50]}")
+                lines.append(f"  ! [correction] {corr.get('rule', '')[:50]}")
                 total_corrs += 1
 
-    print(f"\nTotal: {total_prefs} preferences, {total_corrs} corrections")
+    lines.append(f"\nTotal: {total_prefs} preferences, {total_corrs} corrections")
+    print("\n".join(lines))
 
     if summaries and not args.dry_run:
         saved = save_summary_preferences(db, summaries)
@@ -183,6 +197,7 @@ def cmd_summarize(args: argparse.Namespace) -> int:
 
 def cmd_refine(args: argparse.Namespace) -> int:
     """Refine detected corrections into proper rules using LLM."""
+    from src.config import get_settings
     from src.db.database import get_database
     from src.analysis.rule_refiner import refine_corrections, save_refined_rules
 
@@ -216,8 +231,25 @@ def cmd_refine(args: argparse.Namespace) -> int:
     return 0
 
 
+# Subcommand dispatch table. Each handler imports its own dependencies,
+# so only the selected command's modules are ever loaded.
+COMMANDS = {
+    "run": cmd_run,
+    "init": cmd_init,
+    "stats": cmd_stats,
+    "extract": cmd_extract,
+    "refine": cmd_refine,
+    "summarize": cmd_summarize,
+}
+
+
 def main() -> int:
     """Main entry point."""
+    # Fast path: plain `stats` needs no argument parsing
+    if sys.argv[1:] == ["stats"]:
+        setup_logging()
+        return cmd_stats(argparse.Namespace(config=None, verbose=False, command="stats"))
+
     parser = argparse.ArgumentParser(
         description="Claude Reinforcement - Learn from Claude Code conversations"
     )
@@ -303,21 +335,11 @@ def main() -> int:
 
     setup_logging(args.verbose)
 
-    if args.command == "run":
-        return cmd_run(args)
-    elif args.command == "init":
-        return cmd_init(args)
-    elif args.command == "stats":
-        return cmd_stats(args)
-    elif args.command == "extract":
-        return cmd_extract(args)
-    elif args.command == "refine":
-        return cmd_refine(args)
-    elif args.command == "summarize":
-        return cmd_summarize(args)
-    else:
+    command = COMMANDS.get(args.command)
+    if command is None:
         parser.print_help()
         return 0
+    return command(args)
 
 
 if __name__ == "__main__":
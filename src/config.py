@@ -1,11 +1,11 @@
 """Configuration management using Pydantic Settings."""
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-import yaml
 
 
 class ServerConfig(BaseSettings):
@@ -24,7 +24,9 @@ class DatabaseConfig(BaseSettings):
 class ObsidianConfig(BaseSettings):
     """Obsidian vault configuration."""
 
-    vault_path: Path = Path("~/pCloudDrive/Personal/Obsidian/personal").expanduser()
+    vault_path: Path = Field(
+        default_factory=lambda: Path("~/pCloudDrive/Personal/Obsidian/personal").expanduser()
+    )
     folder: str = "AI-improvement"
 
     @property
@@ -36,7 +38,9 @@ class ObsidianConfig(BaseSettings):
 class SyncConfig(BaseSettings):
     """Sync configuration."""
 
-    claude_projects_path: Path = Path("~/.claude/projects").expanduser()
+    claude_projects_path: Path = Field(
+        default_factory=lambda: Path("~/.claude/projects").expanduser()
+    )
 
 
 class AnalysisConfig(BaseSettings):
@@ -88,13 +92,33 @@ class Settings(BaseSettings):
     @classmethod
     def from_yaml(cls, path: Path) -> "Settings":
         """Load settings from a YAML file."""
-        with open(path) as f:
-            data = yaml.safe_load(f)
+        # PyYAML is only needed when a config file is actually used
+        import yaml
+
+        try:
+            from yaml import CSafeLoader as Loader
+        except ImportError:  # PyYAML built without libyaml
+            from yaml import SafeLoader as Loader
+
+        with open(path, "rb") as f:
+            data = yaml.load(f, Loader=Loader)
         return cls(**data)
 
 
+@lru_cache(maxsize=8)
+def _get_settings_cached(path_str: str | None, mtime: float | None) -> Settings:
+    """Build settings once per (config path, modification time)."""
+    if path_str:
+        return Settings.from_yaml(Path(path_str))
+    return Settings()
+
+
 def get_settings(config_path: Path | None = None) -> Settings:
-    """Get application settings."""
+    """Get application settings.
+
+    Results are cached per process; editing the config file invalidates
+    the cached entry because its mtime is part of the key.
+    """
     if config_path and config_path.exists():
-        return Settings.from_yaml(config_path)
-    return Settings()
+        return _get_settings_cached(str(config_path), config_path.stat().st_mtime)
+    return _get_settings_cached(None, None)
@@ -1,12 +1,190 @@
 """SQLite database with sqlite-vec for vector operations."""
 
+from collections.abc import Generator, Iterator
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Generator
+from typing import TYPE_CHECKING, Any
 import json
+import threading
 
-import apsw
-import sqlite_vec
+if TYPE_CHECKING:
+    import apsw
+
+
+# Full schema, executed as one multi-statement script by init_schema()
+SCHEMA_SQL = """
+-- Conversations table
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    project_path TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    started_at TEXT,
+    ended_at TEXT,
+    git_branch TEXT,
+    synced_at TEXT
+);
+
+-- Messages table
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    conversation_id TEXT NOT NULL REFERENCES conversations(id),
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT,
+    parent_uuid TEXT,
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+);
+
+-- Message embeddings virtual table (384-dim for all-MiniLM-L6-v2,
+-- int8-quantized: scale each vector by 127 / max_abs before insert;
+-- partitioned by conversation so scoped KNN scans one shard)
+CREATE VIRTUAL TABLE IF NOT EXISTS message_embeddings USING vec0(
+    message_id TEXT PRIMARY KEY,
+    conversation_id TEXT PARTITION KEY,
+    embedding INT8[384]
+);
+
+-- Project classifications
+CREATE TABLE IF NOT EXISTS project_classifications (
+    project_path TEXT PRIMARY KEY,
+    project_type TEXT NOT NULL,
+    detected_at TEXT,
+    confidence REAL
+);
+
+-- File type preferences
+CREATE TABLE IF NOT EXISTS file_type_preferences (
+    id TEXT PRIMARY KEY,
+    file_extension TEXT NOT NULL,
+    category TEXT NOT NULL,
+    preference_key TEXT NOT NULL,
+    preference_value TEXT NOT NULL,
+    evidence TEXT,
+    occurrence_count INTEGER DEFAULT 1,
+    confidence REAL,
+    first_seen TEXT,
+    last_seen TEXT,
+    UNIQUE(file_extension, preference_key)
+);
+
+-- Corrections
+CREATE TABLE IF NOT EXISTS corrections (
+    id TEXT PRIMARY KEY,
+    message_id TEXT NOT NULL REFERENCES messages(id),
+    target_msg_id TEXT REFERENCES messages(id),
+    correction_type TEXT,
+    extracted_rule TEXT,
+    confidence REAL,
+    reviewed INTEGER DEFAULT 0,
+    approved INTEGER,
+    FOREIGN KEY (message_id) REFERENCES messages(id)
+);
+
+-- Learned rules
+CREATE TABLE IF NOT EXISTS learned_rules (
+    id TEXT PRIMARY KEY,
+    rule_text TEXT NOT NULL,
+    source TEXT,
+    project_scope TEXT,
+    project_type TEXT,
+    file_types TEXT,
+    active INTEGER DEFAULT 1,
+    created_at TEXT,
+    approved_at TEXT
+);
+
+-- Review queue
+CREATE TABLE IF NOT EXISTS review_queue (
+    id TEXT PRIMARY KEY,
+    rule_type TEXT NOT NULL,
+    proposed_rule TEXT NOT NULL,
+    file_types TEXT,
+    project_scope TEXT,
+    confidence REAL,
+    status TEXT DEFAULT 'pending',
+    created_at TEXT,
+    reviewed_at TEXT
+);
+
+-- Review evidence
+CREATE TABLE IF NOT EXISTS review_evidence (
+    id TEXT PRIMARY KEY,
+    review_id TEXT NOT NULL REFERENCES review_queue(id),
+    conversation_id TEXT REFERENCES conversations(id),
+    project_path TEXT,
+    timestamp TEXT,
+    context_before TEXT,
+    trigger_message TEXT,
+    context_after TEXT,
+    file_touched TEXT,
+    evidence_type TEXT,
+    FOREIGN KEY (review_id) REFERENCES review_queue(id)
+);
+
+-- Documents (for Obsidian/docs integration)
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    project_path TEXT,
+    content TEXT,
+    content_hash TEXT,
+    last_synced TEXT
+);
+
+-- Document chunks with embeddings (int8-quantized, as above)
+CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks USING vec0(
+    id TEXT PRIMARY KEY,
+    document_id TEXT,
+    chunk_text TEXT,
+    chunk_index INTEGER,
+    embedding INT8[384]
+);
+
+-- File edits for silent fix detection
+CREATE TABLE IF NOT EXISTS file_edits (
+    id TEXT PRIMARY KEY,
+    conversation_id TEXT REFERENCES conversations(id),
+    file_path TEXT NOT NULL,
+    file_extension TEXT NOT NULL,
+    claude_wrote TEXT,
+    final_version TEXT,
+    diff_summary TEXT,
+    timestamp TEXT,
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id);
+CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp);
+CREATE INDEX IF NOT EXISTS idx_conversations_project ON conversations(project_path);
+CREATE INDEX IF NOT EXISTS idx_corrections_reviewed_confidence
+    ON corrections(reviewed, confidence DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_synced ON conversations(synced_at);
+CREATE INDEX IF NOT EXISTS idx_review_evidence_review
+    ON review_evidence(review_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_review_queue_status_conf
+    ON review_queue(status, confidence DESC);
+CREATE INDEX IF NOT EXISTS idx_review_queue_proposed_rule
+    ON review_queue(proposed_rule);
+CREATE INDEX IF NOT EXISTS idx_learned_rules_active_approved
+    ON learned_rules(active, approved_at DESC);
+CREATE INDEX IF NOT EXISTS idx_learned_rules_source_approved
+    ON learned_rules(source, approved_at);
+
+-- Superseded by the composite status/active indexes above, which also
+-- serve the ORDER BY of the hot queries
+DROP INDEX IF EXISTS idx_review_queue_status;
+DROP INDEX IF EXISTS idx_learned_rules_active;
+"""
+
+
+# Prepared statements kept per connection (apsw default is 100)
+STATEMENT_CACHE_SIZE = 256
+
+# Rows sampled per index when refreshing planner statistics (the value
+# SQLite's documentation suggests for PRAGMA optimize)
+ANALYSIS_LIMIT = 400
 
 
 class Database:
@@ -17,12 +195,21 @@ class Database:
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._connection: apsw.Connection | None = None
+        # Reused by calls that run their statement to completion; the
+        # instance is single-threaded, like the connection it wraps
+        self._scratch_cursor: apsw.Cursor | None = None
 
     @property
-    def connection(self) -> apsw.Connection:
+    def connection(self) -> "apsw.Connection":
         """Get or create database connection."""
         if self._connection is None:
-            self._connection = apsw.Connection(str(self.db_path))
+            # Native extensions are loaded on first use, not at import time
+            import apsw
+            import sqlite_vec
+
+            self._connection = apsw.Connection(
+                str(self.db_path), statementcachesize=STATEMENT_CACHE_SIZE
+            )
             self._connection.enable_load_extension(True)
             sqlite_vec.load(self._connection)
             self._connection.enable_load_extension(False)
@@ -32,13 +219,17 @@ class Database:
     def _setup_pragmas(self) -> None:
         """Set up SQLite pragmas for performance."""
         cursor = self.connection.cursor()
+        # page_size only takes effect on a new database, before WAL is enabled
+        cursor.execute("PRAGMA page_size=8192")
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute("PRAGMA synchronous=NORMAL")
         cursor.execute("PRAGMA cache_size=10000")
         cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        cursor.execute("PRAGMA temp_store=MEMORY")
 
     @contextmanager
-    def cursor(self) -> Generator[apsw.Cursor, None, None]:
+    def cursor(self) -> Generator["apsw.Cursor", None, None]:
         """Context manager for database cursor."""
         cursor = self.connection.cursor()
         try:
@@ -47,10 +238,15 @@ class Database:
             pass  # apsw cursors don't need explicit close
 
     @contextmanager
-    def transaction(self) -> Generator[apsw.Cursor, None, None]:
-        """Context manager for database transaction."""
+    def transaction(self, mode: str = "IMMEDIATE") -> Generator["apsw.Cursor", None, None]:
+        """Context manager for database transaction.
+
+        Defaults to BEGIN IMMEDIATE so write batches take the write lock
+        up front rather than upgrading (and possibly hitting SQLITE_BUSY)
+        mid-transaction. Pass mode="DEFERRED" for read-mostly callers.
+        """
         cursor = self.connection.cursor()
-        cursor.execute("BEGIN")
+        cursor.execute(f"BEGIN {mode}")
         try:
             yield cursor
             cursor.execute("COMMIT")
@@ -58,232 +254,104 @@ class Database:
             cursor.execute("ROLLBACK")
             raise
 
-    def execute(self, sql: str, params: tuple[Any, ...] | None = None) -> apsw.Cursor:
+    @contextmanager
+    def read_transaction(self) -> Generator["apsw.Cursor", None, None]:
+        """Context manager that runs several reads against one snapshot.
+
+        Uses a deferred BEGIN, so no write lock is taken; the snapshot and
+        its shared lock are acquired once instead of once per statement.
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN DEFERRED")
+        try:
+            yield cursor
+        except BaseException:
+            # SQLite may already have ended the transaction (I/O error,
+            # interrupt); don't let ROLLBACK mask the original error
+            if not self.connection.getautocommit():
+                cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+
+    def execute(self, sql: str, params: tuple[Any, ...] | None = None) -> "apsw.Cursor":
         """Execute a SQL statement."""
         cursor = self.connection.cursor()
         if params:
             return cursor.execute(sql, params)
         return cursor.execute(sql)
 
+    def _scratch(self) -> "apsw.Cursor":
+        """Get the shared cursor for statements that are fully consumed."""
+        if self._scratch_cursor is None:
+            self._scratch_cursor = self.connection.cursor()
+        return self._scratch_cursor
+
     def executemany(self, sql: str, params: list[tuple[Any, ...]]) -> None:
         """Execute a SQL statement with multiple parameter sets."""
-        cursor = self.connection.cursor()
-        cursor.executemany(sql, params)
+        self._scratch().executemany(sql, params)
 
     def fetchone(self, sql: str, params: tuple[Any, ...] | None = None) -> tuple[Any, ...] | None:
         """Execute and fetch one result."""
+        # Fresh cursor: it is released (and its statement reset) on return,
+        # rather than leaving a half-read statement on the shared cursor
         cursor = self.execute(sql, params)
         return cursor.fetchone()
 
+    def iter_rows(
+        self, sql: str, params: tuple[Any, ...] | None = None
+    ) -> Iterator[tuple[Any, ...]]:
+        """Execute and stream results row by row without building a list."""
+        return self.execute(sql, params)
+
     def fetchall(self, sql: str, params: tuple[Any, ...] | None = None) -> list[tuple[Any, ...]]:
         """Execute and fetch all results."""
-        cursor = self.execute(sql, params)
-        return cursor.fetchall()
+        cursor = self._scratch()
+        if params:
+            return cursor.execute(sql, params).fetchall()
+        return cursor.execute(sql).fetchall()
 
     def init_schema(self) -> None:
         """Initialize database schema."""
         with self.transaction() as cursor:
-            # Conversations table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id TEXT PRIMARY KEY,
-                    device_id TEXT NOT NULL,
-                    project_path TEXT NOT NULL,
-                    session_id TEXT NOT NULL,
-                    started_at TEXT,
-                    ended_at TEXT,
-                    git_branch TEXT,
-                    synced_at TEXT
-                )
-            """)
-
-            # Messages table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    id TEXT PRIMARY KEY,
-                    conversation_id TEXT NOT NULL REFERENCES conversations(id),
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TEXT,
-                    parent_uuid TEXT,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
-                )
-            """)
-
-            # Message embeddings virtual table (384-dim for all-MiniLM-L6-v2)
-            cursor.execute("""
-                CREATE VIRTUAL TABLE IF NOT EXISTS message_embeddings USING vec0(
-                    message_id TEXT PRIMARY KEY,
-                    embedding FLOAT[384]
-                )
-            """)
-
-            # Project classifications
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS project_classifications (
-                    project_path TEXT PRIMARY KEY,
-                    project_type TEXT NOT NULL,
-                    detected_at TEXT,
-                    confidence REAL
-                )
-            """)
-
-            # File type preferences
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS file_type_preferences (
-                    id TEXT PRIMARY KEY,
-                    file_extension TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    preference_key TEXT NOT NULL,
-                    preference_value TEXT NOT NULL,
-                    evidence TEXT,
-                    occurrence_count INTEGER DEFAULT 1,
-                    confidence REAL,
-                    first_seen TEXT,
-                    last_seen TEXT,
-                    UNIQUE(file_extension, preference_key)
-                )
-            """)
-
-            # Corrections
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS corrections (
-                    id TEXT PRIMARY KEY,
-                    message_id TEXT NOT NULL REFERENCES messages(id),
-                    target_msg_id TEXT REFERENCES messages(id),
-                    correction_type TEXT,
-                    extracted_rule TEXT,
-                    confidence REAL,
-                    reviewed INTEGER DEFAULT 0,
-                    approved INTEGER,
-                    FOREIGN KEY (message_id) REFERENCES messages(id)
-                )
-            """)
-
-            # Learned rules
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS learned_rules (
-                    id TEXT PRIMARY KEY,
-                    rule_text TEXT NOT NULL,
-                    source TEXT,
-                    project_scope TEXT,
-                    project_type TEXT,
-                    file_types TEXT,
-                    active INTEGER DEFAULT 1,
-                    created_at TEXT,
-                    approved_at TEXT
-                )
-            """)
-
-            # Review queue
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS review_queue (
-                    id TEXT PRIMARY KEY,
-                    rule_type TEXT NOT NULL,
-                    proposed_rule TEXT NOT NULL,
-                    file_types TEXT,
-                    project_scope TEXT,
-                    confidence REAL,
-                    status TEXT DEFAULT 'pending',
-                    created_at TEXT,
-                    reviewed_at TEXT
-                )
-            """)
-
-            # Review evidence
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS review_evidence (
-                    id TEXT PRIMARY KEY,
-                    review_id TEXT NOT NULL REFERENCES review_queue(id),
-                    conversation_id TEXT REFERENCES conversations(id),
-                    project_path TEXT,
-                    timestamp TEXT,
-                    context_before TEXT,
-                    trigger_message TEXT,
-                    context_after TEXT,
-                    file_touched TEXT,
-                    evidence_type TEXT,
-                    FOREIGN KEY (review_id) REFERENCES review_queue(id)
-                )
-            """)
-
-            # Documents (for Obsidian/docs integration)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS documents (
-                    id TEXT PRIMARY KEY,
-                    file_path TEXT NOT NULL,
-                    project_path TEXT,
-                    content TEXT,
-                    content_hash TEXT,
-                    last_synced TEXT
-                )
-            """)
-
-            # Document chunks with embeddings
-            cursor.execute("""
-                CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks USING vec0(
-                    id TEXT PRIMARY KEY,
-                    document_id TEXT,
-                    chunk_text TEXT,
-                    chunk_index INTEGER,
-                    embedding FLOAT[384]
-                )
-            """)
-
-            # File edits for silent fix detection
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS file_edits (
-                    id TEXT PRIMARY KEY,
-                    conversation_id TEXT REFERENCES conversations(id),
-                    file_path TEXT NOT NULL,
-                    file_extension TEXT NOT NULL,
-                    claude_wrote TEXT,
-                    final_version TEXT,
-                    diff_summary TEXT,
-                    timestamp TEXT,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
-                )
-            """)
-
-            # Create indexes
-            cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_messages_conversation "
-                "ON messages(conversation_id)"
-            )
-            cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_messages_timestamp "
-                "ON messages(timestamp)"
-            )
-            cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_conversations_project "
-                "ON conversations(project_path)"
-            )
-            cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_review_queue_status "
-                "ON review_queue(status)"
-            )
-            cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_learned_rules_active "
-                "ON learned_rules(active)"
-            )
+            cursor.execute(SCHEMA_SQL)
+
+    def analyze(self) -> None:
+        """Refresh query planner statistics after bulk loads.
+
+        PRAGMA optimize only re-analyzes tables whose statistics are stale,
+        and analysis_limit caps the rows sampled per index, so this stays
+        cheap as message history grows.
+        """
+        self.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        self.execute("PRAGMA optimize")
 
     def close(self) -> None:
         """Close database connection."""
         if self._connection is not None:
+            self._scratch_cursor = None
             self._connection.close()
             self._connection = None
 
 
-# Global database instance
-_database: Database | None = None
+# Per-thread database instances: each worker thread gets its own connection
+# to the same file, and WAL mode lets them read concurrently
+_local = threading.local()
+
+# Guards schema creation so threads racing on an empty database don't collide
+_schema_lock = threading.Lock()
+_initialized_paths: set[Path] = set()
 
 
 def get_database(db_path: Path | None = None) -> Database:
-    """Get or create the global database instance."""
-    global _database
-    if _database is None:
+    """Get or create the database instance for the current thread."""
+    database: Database | None = getattr(_local, "database", None)
+    if database is None:
         if db_path is None:
             raise ValueError("db_path required for initial database creation")
-        _database = Database(db_path)
-        _database.init_schema()
-    return _database
+        database = Database(db_path)
+        with _schema_lock:
+            if db_path not in _initialized_paths:
+                database.init_schema()
+                _initialized_paths.add(db_path)
+        _local.database = database
+    return database
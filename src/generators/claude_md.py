@@ -5,15 +5,17 @@ Supports two output modes:
 2. Modern: Write to .claude/rules/ with YAML frontmatter (recommended)
 """
 
+import re
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterator
-import json
 
+from src.analysis.classifier import get_classification, get_parent_types, get_project_types
 from src.db.database import Database
-from src.analysis.classifier import get_classification, get_parent_types
-
+from src.generators.fileio import GENERATED_MARKER, atomic_write, write_if_changed
+from src.jsonutil import json_loads
 
 # Mapping from file extensions to glob patterns
 FILE_TYPE_TO_GLOB = {
@@ -41,8 +43,22 @@ CATEGORY_TO_FILENAME = {
     "Software": "software.md",
 }
 
+# Category keywords, matched as substrings of the lower-cased rule text
+WORKFLOW_KEYWORDS = ("commit", "git", "test", "build", "run")
+COMMUNICATION_KEYWORDS = ("concise", "verbose", "emoji", "format")
+CODE_STYLE_KEYWORDS = ("indent", "style", "naming", "pipe")
+
+_WORKFLOW_RE = re.compile("|".join(WORKFLOW_KEYWORDS))
+_COMMUNICATION_RE = re.compile("|".join(COMMUNICATION_KEYWORDS))
+_CODE_STYLE_RE = re.compile("|".join(CODE_STYLE_KEYWORDS))
+
+# Markers delimiting the auto-generated section of a CLAUDE.md file
+# (bytes: the file is spliced without decoding)
+MARKER_START = b"<!-- BEGIN CLAUDE-REINFORCEMENT -->"
+MARKER_END = b"<!-- END CLAUDE-REINFORCEMENT -->"
 
-@dataclass
+
+@dataclass(slots=True)
 class Rule:
     """A learned rule."""
 
@@ -57,6 +73,12 @@ class Rule:
     approved_at: str | None
 
 
+@lru_cache(maxsize=1024)
+def _decode_file_types(raw: str) -> tuple[str, ...]:
+    """Decode a file_types JSON column; the set of distinct values is small."""
+    return tuple(json_loads(raw))
+
+
 def get_active_rules(db: Database) -> list[Rule]:
     """Get all active learned rules."""
     results = db.fetchall(
@@ -70,19 +92,21 @@ def get_active_rules(db: Database) -> list[Rule]:
     )
 
     rules = []
-    for row in results:
-        file_types = json.loads(row[5]) if row[5] else []
+    for (
+        rule_id, rule_text, source, project_scope, project_type,
+        file_types_json, active, created_at, approved_at,
+    ) in results:
         rules.append(
             Rule(
-                id=row[0],
-                rule_text=row[1],
-                source=row[2],
-                project_scope=row[3],
-                project_type=row[4],
-                file_types=file_types,
-                active=bool(row[6]),
-                created_at=row[7],
-                approved_at=row[8],
+                id=rule_id,
+                rule_text=rule_text,
+                source=source,
+                project_scope=project_scope,
+                project_type=project_type,
+                file_types=list(_decode_file_types(file_types_json)) if file_types_json else [],
+                active=active != 0,
+                created_at=created_at,
+                approved_at=approved_at,
             )
         )
 
@@ -92,6 +116,8 @@ def get_active_rules(db: Database) -> list[Rule]:
 def get_rules_for_project(
     db: Database,
     project_path: str,
+    all_rules: list[Rule] | None = None,
+    project_types: dict[str, str] | None = None,
 ) -> list[Rule]:
     """Get rules applicable to a specific project.
 
@@ -99,15 +125,35 @@ def get_rules_for_project(
     1. Project-specific rules
     2. Project-type rules (with inheritance)
     3. Global rules
+
+    Pass all_rules (from get_active_rules) to avoid re-querying per project.
     """
-    all_rules = get_active_rules(db)
+    if all_rules is None:
+        all_rules = get_active_rules(db)
+
+    return get_rules_for_project_from_list(db, project_path, all_rules, project_types)
 
+
+def get_rules_for_project_from_list(
+    db: Database,
+    project_path: str,
+    all_rules: list[Rule],
+    project_types: dict[str, str] | None = None,
+) -> list[Rule]:
+    """Filter a prefetched list of active rules down to one project.
+
+    project_types (from get_project_types) replaces the per-project
+    classification lookup when given.
+    """
     # Get project classification
-    classification = get_classification(db, project_path)
-    project_type = classification.project_type if classification else None
+    if project_types is not None:
+        project_type = project_types.get(project_path)
+    else:
+        classification = get_classification(db, project_path)
+        project_type = classification.project_type if classification else None
 
     # Get type hierarchy
-    type_chain = get_parent_types(project_type) if project_type else []
+    type_chain = get_parent_types(project_type) if project_type else ()
 
     applicable_rules = []
 
@@ -138,15 +184,17 @@ def group_rules_by_category(rules: list[Rule]) -> dict[str, list[Rule]]:
     }
 
     for rule in rules:
-        text_lower = rule.rule_text.lower()
-
         if rule.file_types:
             categories["File-Specific"].append(rule)
-        elif any(kw in text_lower for kw in ["commit", "git", "test", "build", "run"]):
+            continue
+
+        text_lower = rule.rule_text.lower()
+
+        if _WORKFLOW_RE.search(text_lower):
             categories["Workflow"].append(rule)
-        elif any(kw in text_lower for kw in ["concise", "verbose", "emoji", "format"]):
+        elif _COMMUNICATION_RE.search(text_lower):
             categories["Communication"].append(rule)
-        elif any(kw in text_lower for kw in ["indent", "style", "naming", "pipe"]):
+        elif _CODE_STYLE_RE.search(text_lower):
             categories["Code Style"].append(rule)
         else:
             categories["General"].append(rule)
@@ -175,6 +223,9 @@ def generate_claude_md(
     db: Database,
     project_path: str | None = None,
     include_header: bool = True,
+    all_rules: list[Rule] | None = None,
+    project_types: dict[str, str] | None = None,
+    today: str | None = None,
 ) -> str:
     """Generate CLAUDE.md content.
 
@@ -182,11 +233,12 @@ def generate_claude_md(
     Otherwise, generates global rules.
     """
     if project_path:
-        rules = get_rules_for_project(db, project_path)
+        rules = get_rules_for_project(db, project_path, all_rules, project_types)
         title = f"Project Instructions - {Path(project_path).name}"
     else:
         # Get only global rules
-        all_rules = get_active_rules(db)
+        if all_rules is None:
+            all_rules = get_active_rules(db)
         rules = [r for r in all_rules if not r.project_scope]
         title = "Claude Code Instructions"
 
@@ -200,10 +252,10 @@ def generate_claude_md(
     lines = []
 
     if include_header:
+        if today is None:
+            today = datetime.utcnow().strftime("%Y-%m-%d")
         lines.append(f"# {title}\n")
-        lines.append(
-            f"_Auto-generated by claude-reinforcement on {datetime.utcnow().strftime('%Y-%m-%d')}_\n"
-        )
+        lines.append(f"_Auto-generated by claude-reinforcement on {today}_\n")
 
     for category, category_rules in grouped.items():
         lines.append(format_rules_section(category, category_rules))
@@ -211,51 +263,74 @@ def generate_claude_md(
     return "\n".join(lines)
 
 
-def write_global_claude_md(db: Database, claude_dir: Path) -> bool:
-    """Write the global CLAUDE.md file.
+def _write_claude_md(claude_md_path: Path, content: str) -> bool:
+    """Write content into the marked section of a CLAUDE.md file.
 
-    Returns True if file was written.
+    Manual content outside the markers is preserved; the section is
+    appended if the file has none yet. Returns False if unchanged.
     """
-    content = generate_claude_md(db, project_path=None)
+    existing = claude_md_path.read_bytes() if claude_md_path.exists() else b""
+    section = MARKER_START + b"\n" + content.encode() + b"\n" + MARKER_END
+
+    start = existing.find(MARKER_START)
+    if start >= 0:
+        # Replace existing auto-generated section; an unterminated
+        # section runs to end of file
+        end = existing.find(MARKER_END, start)
+        after = existing[end + len(MARKER_END):] if end >= 0 else b""
+        new_content = existing[:start] + section + after
+    else:
+        # Append to end of file
+        new_content = existing + b"\n\n" + section + b"\n"
 
-    if not content:
+    if new_content == existing:
         return False
 
-    # Ensure directory exists
-    claude_dir.mkdir(parents=True, exist_ok=True)
+    atomic_write(claude_md_path, new_content)
+    return True
 
-    # Read existing file to preserve manual content
-    claude_md_path = claude_dir / "CLAUDE.md"
-    existing_content = ""
 
-    if claude_md_path.exists():
-        existing_content = claude_md_path.read_text()
+def write_global_claude_md(
+    db: Database,
+    claude_dir: Path,
+    rules: list[Rule] | None = None,
+    today: str | None = None,
+) -> bool:
+    """Write the global CLAUDE.md file.
 
-    # Look for auto-generated section marker
-    marker_start = "<!-- BEGIN CLAUDE-REINFORCEMENT -->"
-    marker_end = "<!-- END CLAUDE-REINFORCEMENT -->"
+    rules is the prefetched active rule list; queried if not given.
+    Returns True if file was written (False if empty or unchanged).
+    """
+    content = generate_claude_md(db, project_path=None, all_rules=rules, today=today)
 
-    if marker_start in existing_content:
-        # Replace existing auto-generated section
-        before = existing_content.split(marker_start)[0]
-        after_parts = existing_content.split(marker_end)
-        after = after_parts[1] if len(after_parts) > 1 else ""
+    if not content:
+        return False
 
-        new_content = f"{before}{marker_start}\n{content}\n{marker_end}{after}"
-    else:
-        # Append to end of file
-        new_content = f"{existing_content}\n\n{marker_start}\n{content}\n{marker_end}\n"
+    # Ensure directory exists
+    claude_dir.mkdir(parents=True, exist_ok=True)
 
-    claude_md_path.write_text(new_content)
-    return True
+    return _write_claude_md(claude_dir / "CLAUDE.md", content)
 
 
-def write_project_claude_md(db: Database, project_path: Path) -> bool:
+def write_project_claude_md(
+    db: Database,
+    project_path: Path,
+    rules: list[Rule] | None = None,
+    project_types: dict[str, str] | None = None,
+    today: str | None = None,
+) -> bool:
     """Write a project-specific CLAUDE.md file.
 
-    Returns True if file was written.
+    rules and project_types are prefetched lookups; queried if not given.
+    Returns True if file was written (False if empty or unchanged).
     """
-    content = generate_claude_md(db, project_path=str(project_path))
+    content = generate_claude_md(
+        db,
+        project_path=str(project_path),
+        all_rules=rules,
+        project_types=project_types,
+        today=today,
+    )
 
     if not content:
         return False
@@ -264,26 +339,7 @@ def write_project_claude_md(db: Database, project_path: Path) -> bool:
     claude_dir = project_path / ".claude"
     claude_dir.mkdir(parents=True, exist_ok=True)
 
-    claude_md_path = claude_dir / "CLAUDE.md"
-
-    # Same logic as global - preserve manual content
-    existing_content = ""
-    if claude_md_path.exists():
-        existing_content = claude_md_path.read_text()
-
-    marker_start = "<!-- BEGIN CLAUDE-REINFORCEMENT -->"
-    marker_end = "<!-- END CLAUDE-REINFORCEMENT -->"
-
-    if marker_start in existing_content:
-        before = existing_content.split(marker_start)[0]
-        after_parts = existing_content.split(marker_end)
-        after = after_parts[1] if len(after_parts) > 1 else ""
-        new_content = f"{before}{marker_start}\n{content}\n{marker_end}{after}"
-    else:
-        new_content = f"{existing_content}\n\n{marker_start}\n{content}\n{marker_end}\n"
-
-    claude_md_path.write_text(new_content)
-    return True
+    return _write_claude_md(claude_dir / "CLAUDE.md", content)
 
 
 def update_all_claude_md_files(
@@ -297,25 +353,33 @@ def update_all_claude_md_files(
     """
     counts = {"global": 0, "projects": 0}
 
-    # Update global
-    if write_global_claude_md(db, global_claude_dir):
-        counts["global"] = 1
+    # One date for every file written in this run
+    today = datetime.utcnow().strftime("%Y-%m-%d")
 
-    # Update project-specific files
-    if project_paths:
-        for project_path in project_paths:
-            if write_project_claude_md(db, project_path):
-                counts["projects"] += 1
-    else:
-        # Get projects from database
-        results = db.fetchall(
-            "SELECT DISTINCT project_path FROM conversations"
-        )
-        for (project_path_str,) in results:
-            project_path = Path(project_path_str)
-            if project_path.exists():
-                if write_project_claude_md(db, project_path):
+    # Read everything from one snapshot rather than one per statement
+    with db.read_transaction():
+        # Fetch active rules and classifications once for all files
+        rules = get_active_rules(db)
+        project_types = get_project_types(db)
+
+        # Update global
+        if write_global_claude_md(db, global_claude_dir, rules, today):
+            counts["global"] = 1
+
+        # Update project-specific files
+        if project_paths:
+            for project_path in project_paths:
+                if write_project_claude_md(db, project_path, rules, project_types, today):
                     counts["projects"] += 1
+        else:
+            # Stream projects from database
+            for (project_path_str,) in db.iter_rows(
+                "SELECT DISTINCT project_path FROM conversations"
+            ):
+                project_path = Path(project_path_str)
+                if project_path.exists():
+                    if write_project_claude_md(db, project_path, rules, project_types, today):
+                        counts["projects"] += 1
 
     return counts
 
@@ -347,12 +411,22 @@ def generate_yaml_frontmatter(paths: list[str] | None = None) -> str:
     return f"---\npaths: [{paths_str}]\n---\n\n"
 
 
+@lru_cache(maxsize=512)
+def _frontmatter_for(file_types: frozenset[str]) -> str:
+    """Frontmatter for a set of file types, in sorted (stable) order."""
+    return generate_yaml_frontmatter(file_types_to_paths(sorted(file_types)))
+
+
 def format_rules_file_modern(
     category: str,
     rules: list[Rule],
     include_paths: bool = True,
+    today: str | None = None,
 ) -> str:
     """Format a category of rules as a modern rule file with frontmatter."""
+    if today is None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+
     lines = []
 
     # Collect all file types for this category
@@ -362,14 +436,11 @@ def format_rules_file_modern(
 
     # Add YAML frontmatter if there are file-type-specific rules
     if include_paths and all_file_types:
-        paths = file_types_to_paths(list(all_file_types))
-        lines.append(generate_yaml_frontmatter(paths))
+        lines.append(_frontmatter_for(frozenset(all_file_types)))
 
     # Add header
     lines.append(f"# {category} Rules\n")
-    lines.append(
-        f"_Auto-generated by claude-reinforcement on {datetime.utcnow().strftime('%Y-%m-%d')}_\n"
-    )
+    lines.append(f"_Auto-generated by claude-reinforcement on {today}_\n")
 
     # Add rules
     for rule in rules:
@@ -383,81 +454,82 @@ def format_rules_file_modern(
     return "\n".join(lines)
 
 
+def _is_generated_file(file_path: Path) -> bool:
+    """Check whether a rule file carries our auto-generated header.
+
+    The marker sits right after the short frontmatter, so only the
+    first 4 KiB are read.
+    """
+    with open(file_path, "rb") as f:
+        return GENERATED_MARKER in f.read(4096)
+
+
 def write_rules_directory(
     db: Database,
     project_path: Path,
+    rules: list[Rule] | None = None,
+    project_types: dict[str, str] | None = None,
+    today: str | None = None,
 ) -> dict[str, int]:
     """Write rules to .claude/rules/ directory with proper structure.
 
+    rules and project_types are prefetched lookups; queried if not given.
     Returns counts of files written.
     """
-    rules = get_rules_for_project(db, str(project_path))
-
-    if not rules:
-        return {"files": 0}
-
-    # Group rules
-    grouped = group_rules_by_category(rules)
-
-    # Create rules directory
-    rules_dir = project_path / ".claude" / "rules"
-    rules_dir.mkdir(parents=True, exist_ok=True)
-
-    files_written = 0
-
-    for category, category_rules in grouped.items():
-        filename = CATEGORY_TO_FILENAME.get(category, f"{category.lower().replace(' ', '-')}.md")
-        file_path = rules_dir / filename
-
-        # Check if file exists and has manual content
-        if file_path.exists():
-            existing = file_path.read_text()
-            # Skip if file exists and doesn't have our marker
-            if "Auto-generated by claude-reinforcement" not in existing:
-                continue
-
-        content = format_rules_file_modern(category, category_rules)
-        file_path.write_text(content)
-        files_written += 1
-
-    return {"files": files_written}
+    rules = get_rules_for_project(db, str(project_path), rules, project_types)
+    return {"files": _write_rule_files(project_path / ".claude" / "rules", rules, today)}
 
 
 def write_global_rules_directory(
     db: Database,
     claude_dir: Path,
+    rules: list[Rule] | None = None,
+    today: str | None = None,
 ) -> dict[str, int]:
     """Write global rules to ~/.claude/rules/ directory.
 
+    rules is the prefetched active rule list; queried if not given.
     Returns counts of files written.
     """
-    all_rules = get_active_rules(db)
-    rules = [r for r in all_rules if not r.project_scope]
+    if rules is None:
+        rules = get_active_rules(db)
+    global_rules = [r for r in rules if not r.project_scope]
+    return {"files": _write_rule_files(claude_dir / "rules", global_rules, today)}
 
+
+def _write_rule_files(rules_dir: Path, rules: list[Rule], today: str | None = None) -> int:
+    """Write one rule file per category into rules_dir.
+
+    Files without our auto-generated marker are left alone. today is the
+    header date; defaults to the current date.
+    Returns the number of files written.
+    """
     if not rules:
-        return {"files": 0}
+        return 0
 
+    # Group rules
     grouped = group_rules_by_category(rules)
 
-    rules_dir = claude_dir / "rules"
+    # Create rules directory
     rules_dir.mkdir(parents=True, exist_ok=True)
 
+    if today is None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
     files_written = 0
 
     for category, category_rules in grouped.items():
         filename = CATEGORY_TO_FILENAME.get(category, f"{category.lower().replace(' ', '-')}.md")
         file_path = rules_dir / filename
 
-        if file_path.exists():
-            existing = file_path.read_text()
-            if "Auto-generated by claude-reinforcement" not in existing:
-                continue
+        # Skip if file exists and has manual content (no marker)
+        if file_path.exists() and not _is_generated_file(file_path):
+            continue
 
-        content = format_rules_file_modern(category, category_rules)
-        file_path.write_text(content)
-        files_written += 1
+        content = format_rules_file_modern(category, category_rules, today=today)
+        if write_if_changed(file_path, content):
+            files_written += 1
 
-    return {"files": files_written}
+    return files_written
 
 
 def update_all_rules_modern(
@@ -471,23 +543,31 @@ def update_all_rules_modern(
     """
     counts = {"global_files": 0, "project_files": 0}
 
-    # Update global rules
-    result = write_global_rules_directory(db, global_claude_dir)
-    counts["global_files"] = result["files"]
+    # One date for every file written in this run
+    today = datetime.utcnow().strftime("%Y-%m-%d")
 
-    # Update project-specific rules
-    if project_paths:
-        for project_path in project_paths:
-            result = write_rules_directory(db, project_path)
-            counts["project_files"] += result["files"]
-    else:
-        results = db.fetchall(
-            "SELECT DISTINCT project_path FROM conversations"
-        )
-        for (project_path_str,) in results:
-            project_path = Path(project_path_str)
-            if project_path.exists():
-                result = write_rules_directory(db, project_path)
+    # Read everything from one snapshot rather than one per statement
+    with db.read_transaction():
+        # Fetch active rules and classifications once for all files
+        rules = get_active_rules(db)
+        project_types = get_project_types(db)
+
+        # Update global rules
+        result = write_global_rules_directory(db, global_claude_dir, rules, today)
+        counts["global_files"] = result["files"]
+
+        # Update project-specific rules
+        if project_paths:
+            for project_path in project_paths:
+                result = write_rules_directory(db, project_path, rules, project_types, today)
                 counts["project_files"] += result["files"]
+        else:
+            for (project_path_str,) in db.iter_rows(
+                "SELECT DISTINCT project_path FROM conversations"
+            ):
+                project_path = Path(project_path_str)
+                if project_path.exists():
+                    result = write_rules_directory(db, project_path, rules, project_types, today)
+                    counts["project_files"] += result["files"]
 
     return counts
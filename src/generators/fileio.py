@@ -0,0 +1,93 @@
+"""Shared file-writing helpers for generators."""
+
+import filecmp
+import os
+import stat
+from collections.abc import Iterable
+from pathlib import Path
+
+# Header line identifying generated files we own and may overwrite
+GENERATED_MARKER = b"Auto-generated by claude-reinforcement"
+
+# Buffer size for streamed writes (larger than io.DEFAULT_BUFFER_SIZE so
+# many small part writes coalesce into few syscalls)
+STREAM_BUFFER_SIZE = 1 << 17
+
+
+def _replace_target(path: Path) -> tuple[Path, Path]:
+    """Return (target, tmp) for replacing path.
+
+    Symlinks are resolved so the rename updates the file they point to
+    rather than replacing the link itself.
+    """
+    target = Path(os.path.realpath(path))
+    return target, target.with_name(target.name + ".tmp")
+
+
+def _replace(tmp: Path, target: Path) -> None:
+    """Rename tmp over target, keeping the existing file's permissions."""
+    try:
+        os.chmod(tmp, stat.S_IMODE(os.stat(target).st_mode))
+    except FileNotFoundError:
+        pass
+    os.replace(tmp, target)
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write data to path via a temp file and rename.
+
+    Readers see either the old or the new file, never a partial write.
+    """
+    target, tmp = _replace_target(path)
+    # Same default mode as open(): 0o666 less the umask
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        _replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write content to path unless the file already holds exactly that.
+
+    Compares sizes first so most changed files are detected with a stat.
+    Returns True if the file was written.
+    """
+    data = content.encode()
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    atomic_write(path, data)
+    return True
+
+
+def write_parts_if_changed(path: Path, parts: Iterable[str]) -> bool:
+    """Stream parts to path via a temp file, keeping the old file if identical.
+
+    The document is never held in memory whole. Returns True if the file
+    was replaced.
+    """
+    target, tmp = _replace_target(path)
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="", buffering=STREAM_BUFFER_SIZE) as f:
+            for part in parts:
+                f.write(part)
+        if target.exists() and filecmp.cmp(tmp, target, shallow=False):
+            tmp.unlink()
+            return False
+        _replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    return True
@@ -1,17 +1,26 @@
 """Obsidian markdown generator for review queue and digests."""
 
+from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Iterator
-import json
+from typing import Any, Iterator
 
-from src.db.database import Database
 from src.analysis.preferences import Preference, get_high_confidence_preferences
 from src.config import ObsidianConfig
+from src.db.database import Database
+from src.generators.fileio import write_if_changed, write_parts_if_changed
+from src.jsonutil import json_loads
+
+# Month abbreviations as produced by strftime("%b") in the C locale
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Max review ids per evidence query (SQLite's default variable limit is 999)
+EVIDENCE_CHUNK_SIZE = 900
 
 
-@dataclass
+@dataclass(slots=True)
 class ReviewItem:
     """An item in the review queue."""
 
@@ -21,7 +30,7 @@ class ReviewItem:
     file_types: list[str]
     project_scope: str | None
     confidence: float
-    evidence: list[dict]
+    evidence: list[dict[str, Any]]
     status: str
     created_at: str
 
@@ -38,20 +47,36 @@ def format_file_types(file_types: list[str]) -> str:
     return ", ".join(f"`{ft}`" for ft in file_types)
 
 
-def format_evidence_snippet(evidence: dict) -> str:
-    """Format a single evidence snippet as markdown."""
-    project_path = evidence.get("project_path") or "unknown"
-    project = project_path.split("/")[-1]
-    timestamp = evidence.get("timestamp", "")
+def format_month_day(timestamp: str | None) -> str:
+    """Format an ISO timestamp as e.g. "Dec 05" (strftime "%b %d").
+
+    YYYY-MM-DD prefixes are sliced directly; anything else goes through
+    datetime.fromisoformat.
+    """
+    if not timestamp:
+        return "unknown date"
+
+    if len(timestamp) >= 10 and timestamp[4] == "-" and timestamp[7] == "-":
+        month, day = timestamp[5:7], timestamp[8:10]
+        if month.isdigit() and day.isdigit() and 1 <= int(month) <= 12:
+            return f"{_MONTHS[int(month) - 1]} {day}"
 
-    # Parse timestamp to get date
     try:
         dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-        date_str = dt.strftime("%b %d")
+        return dt.strftime("%b %d")
     except (ValueError, AttributeError):
-        date_str = "unknown date"
+        return "unknown date"
+
+
+def format_evidence_snippet(evidence: dict[str, Any]) -> str:
+    """Format a single evidence snippet as markdown."""
+    project_path: str = evidence.get("project_path") or "unknown"
+    project = project_path.split("/")[-1]
+    timestamp: str | None = evidence.get("timestamp", "")
+
+    date_str = format_month_day(timestamp)
 
-    message = evidence.get("message", "")
+    message: str = evidence.get("message", "")
 
     # Truncate long messages
     if len(message) > 300:
@@ -96,16 +121,11 @@ def generate_review_item_markdown(item: ReviewItem, index: int) -> str:
 """
 
 
-def generate_pending_review_note(
+def get_pending_review_items(
     db: Database,
     min_confidence: float = 0.5,
-) -> tuple[str, list[ReviewItem]]:
-    """Generate the pending review note content.
-
-    Returns (markdown_content, review_items).
-    """
-    today = datetime.utcnow().strftime("%Y-%m-%d")
-
+) -> list[ReviewItem]:
+    """Get pending review items plus unqueued preferences, by confidence."""
     # Get items from review queue
     results = db.fetchall(
         """
@@ -118,56 +138,62 @@ def generate_pending_review_note(
         (min_confidence,),
     )
 
-    items: list[ReviewItem] = []
-    for row in results:
-        # Get evidence for this item
-        evidence_results = db.fetchall(
-            """
-            SELECT conversation_id, project_path, timestamp,
+    # Fetch evidence for all items at once (chunked to stay under
+    # SQLite's bound-variable limit) and bucket it by review id
+    evidence_by_id: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    ids = [row[0] for row in results]
+    for start in range(0, len(ids), EVIDENCE_CHUNK_SIZE):
+        chunk = ids[start:start + EVIDENCE_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        evidence_rows = db.fetchall(
+            f"""
+            SELECT review_id, conversation_id, project_path, timestamp,
                    trigger_message, evidence_type
             FROM review_evidence
-            WHERE review_id = ?
+            WHERE review_id IN ({placeholders})
             ORDER BY timestamp DESC
             """,
-            (row[0],),
+            tuple(chunk),
         )
+        for (
+            review_id, conversation_id, project_path, timestamp,
+            message, evidence_type,
+        ) in evidence_rows:
+            evidence_by_id[review_id].append(
+                {
+                    "conversation_id": conversation_id,
+                    "project_path": project_path,
+                    "timestamp": timestamp,
+                    "message": message,
+                    "type": evidence_type,
+                }
+            )
 
-        evidence = [
-            {
-                "conversation_id": e[0],
-                "project_path": e[1],
-                "timestamp": e[2],
-                "message": e[3],
-                "type": e[4],
-            }
-            for e in evidence_results
-        ]
-
-        file_types = json.loads(row[3]) if row[3] else []
-
+    items: list[ReviewItem] = []
+    for (
+        review_id, rule_type, proposed_rule, file_types_json,
+        project_scope, confidence, status, created_at,
+    ) in results:
         items.append(
             ReviewItem(
-                id=row[0],
-                rule_type=row[1],
-                proposed_rule=row[2],
-                file_types=file_types,
-                project_scope=row[4],
-                confidence=row[5],
-                evidence=evidence,
-                status=row[6],
-                created_at=row[7],
+                id=review_id,
+                rule_type=rule_type,
+                proposed_rule=proposed_rule,
+                file_types=json_loads(file_types_json) if file_types_json else [],
+                project_scope=project_scope,
+                confidence=confidence,
+                evidence=evidence_by_id.get(review_id, []),
+                status=status,
+                created_at=created_at,
             )
         )
 
     # Also include high-confidence preferences not yet in review queue
     preferences = get_high_confidence_preferences(db, min_confidence)
+    queued_rules = {rule for (rule,) in db.fetchall("SELECT proposed_rule FROM review_queue")}
     for pref in preferences:
         # Check if already in queue
-        existing = db.fetchone(
-            "SELECT id FROM review_queue WHERE proposed_rule = ?",
-            (pref.preference_value,),
-        )
-        if not existing:
+        if pref.preference_value not in queued_rules:
             items.append(
                 ReviewItem(
                     id=pref.id,
@@ -185,6 +211,11 @@ def generate_pending_review_note(
     # Sort by confidence
     items.sort(key=lambda x: x.confidence, reverse=True)
 
+    return items
+
+
+def iter_pending_review_note(items: list[ReviewItem], today: str) -> Iterator[str]:
+    """Yield the pending review note markdown piece by piece."""
     # Group items by category
     category_labels = {
         "workflow": "Workflow & Process",
@@ -226,7 +257,7 @@ def generate_pending_review_note(
     needs_review = len(items) - high_confidence
 
     # Generate markdown with grouped sections
-    content = f"""# Pending Rule Reviews - {today}
+    yield f"""# Pending Rule Reviews - {today}
 
 ## Summary
 
@@ -242,9 +273,9 @@ def generate_pending_review_note(
     for cat in category_order:
         if cat in grouped:
             count = len(grouped[cat])
-            content += f"- **{cat}**: {count} rule{'s' if count != 1 else ''}\n"
+            yield f"- **{cat}**: {count} rule{'s' if count != 1 else ''}\n"
 
-    content += "\n---\n\n"
+    yield "\n---\n\n"
 
     # Generate sections by category
     rule_idx = 1
@@ -253,37 +284,47 @@ def generate_pending_review_note(
             continue
 
         cat_items = grouped[cat]
-        content += f"# {cat}\n\n"
+        yield f"# {cat}\n\n"
 
         for item in cat_items:
-            content += generate_review_item_markdown(item, rule_idx)
+            yield generate_review_item_markdown(item, rule_idx)
             rule_idx += 1
 
-    return content, items
 
+def generate_pending_review_note(
+    db: Database,
+    min_confidence: float = 0.5,
+    today: str | None = None,
+) -> tuple[str, list[ReviewItem]]:
+    """Generate the pending review note content.
 
-def generate_digest_note(db: Database) -> str:
-    """Generate the daily digest note content."""
-    today = datetime.utcnow().strftime("%Y-%m-%d")
-    yesterday = (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d")
+    today is the YYYY-MM-DD date to stamp; defaults to the current UTC date.
+    Returns (markdown_content, review_items).
+    """
+    if today is None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
 
-    # Get stats
-    total_conversations = db.fetchone(
-        "SELECT COUNT(*) FROM conversations"
-    )[0]
+    items = get_pending_review_items(db, min_confidence)
+    return "".join(iter_pending_review_note(items, today)), items
 
-    new_conversations = db.fetchone(
-        "SELECT COUNT(*) FROM conversations WHERE synced_at >= ?",
-        (yesterday,),
-    )[0]
 
-    total_rules = db.fetchone(
-        "SELECT COUNT(*) FROM learned_rules WHERE active = 1"
-    )[0]
+def generate_digest_note(db: Database, today: str | None = None) -> str:
+    """Generate the daily digest note content."""
+    if today is None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+    yesterday = (date.fromisoformat(today) - timedelta(days=1)).isoformat()
 
-    pending_reviews = db.fetchone(
-        "SELECT COUNT(*) FROM review_queue WHERE status = 'pending'"
-    )[0]
+    # Get stats in one round-trip
+    total_conversations, new_conversations, total_rules, pending_reviews = db.fetchone(
+        """
+        SELECT
+            (SELECT COUNT(*) FROM conversations),
+            (SELECT COUNT(*) FROM conversations WHERE synced_at >= ?),
+            (SELECT COUNT(*) FROM learned_rules WHERE active = 1),
+            (SELECT COUNT(*) FROM review_queue WHERE status = 'pending')
+        """,
+        (yesterday,),
+    )
 
     # Get recent auto-approved
     auto_approved = db.fetchall(
@@ -311,17 +352,19 @@ def generate_digest_note(db: Database) -> str:
         (yesterday,),
     )
 
-    auto_approved_md = ""
     if auto_approved:
-        for rule, _ in auto_approved:
-            auto_approved_md += f"- \"{rule[:80]}{'...' if len(rule) > 80 else ''}\"\n"
+        auto_approved_md = "".join(
+            f"- \"{rule[:80]}{'...' if len(rule) > 80 else ''}\"\n"
+            for rule, _ in auto_approved
+        )
     else:
         auto_approved_md = "_None today_\n"
 
-    patterns_md = ""
     if top_patterns:
-        for pattern_type, count in top_patterns:
-            patterns_md += f"- {pattern_type}: {count} occurrences\n"
+        patterns_md = "".join(
+            f"- {pattern_type}: {count} occurrences\n"
+            for pattern_type, count in top_patterns
+        )
     else:
         patterns_md = "_No patterns detected_\n"
 
@@ -349,20 +392,20 @@ def generate_digest_note(db: Database) -> str:
 """
 
 
-def generate_index_note(db: Database) -> str:
+def generate_index_note(db: Database, today: str | None = None) -> str:
     """Generate the index/dashboard note."""
-    # Get counts
-    total_rules = db.fetchone(
-        "SELECT COUNT(*) FROM learned_rules WHERE active = 1"
-    )[0]
-
-    global_rules = db.fetchone(
-        "SELECT COUNT(*) FROM learned_rules WHERE active = 1 AND project_scope IS NULL"
-    )[0]
+    if today is None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
 
-    pending = db.fetchone(
-        "SELECT COUNT(*) FROM review_queue WHERE status = 'pending'"
-    )[0]
+    # Get counts in one round-trip
+    total_rules, global_rules, pending = db.fetchone(
+        """
+        SELECT
+            (SELECT COUNT(*) FROM learned_rules WHERE active = 1),
+            (SELECT COUNT(*) FROM learned_rules WHERE active = 1 AND project_scope IS NULL),
+            (SELECT COUNT(*) FROM review_queue WHERE status = 'pending')
+        """
+    )
 
     # Get file type breakdown
     file_type_counts = db.fetchall(
@@ -376,11 +419,10 @@ def generate_index_note(db: Database) -> str:
         """
     )
 
-    file_types_md = ""
-    for ext, count in file_type_counts:
-        file_types_md += f"- [[rules/by-type/{ext.replace('.', '')}|{ext} Rules]] ({count})\n"
-
-    today = datetime.utcnow().strftime("%Y-%m-%d")
+    file_types_md = "".join(
+        f"- [[rules/by-type/{ext.replace('.', '')}|{ext} Rules]] ({count})\n"
+        for ext, count in file_type_counts
+    )
 
     return f"""# Claude Reinforcement Dashboard
 
@@ -413,7 +455,7 @@ _See daily digests for activity history_
 def write_obsidian_notes(db: Database, config: ObsidianConfig) -> dict[str, int]:
     """Write all Obsidian notes to the vault.
 
-    Returns dict with counts of files written.
+    Returns dict with counts of files written; unchanged notes are skipped.
     """
     output_path = config.output_path
     output_path.mkdir(parents=True, exist_ok=True)
@@ -428,22 +470,25 @@ def write_obsidian_notes(db: Database, config: ObsidianConfig) -> dict[str, int]
     today = datetime.utcnow().strftime("%Y-%m-%d")
     counts = {"reviews": 0, "digests": 0, "index": 0}
 
-    # Generate pending review note
-    review_content, _ = generate_pending_review_note(db)
+    # Read everything for the notes from one consistent snapshot
+    with db.read_transaction():
+        review_items = get_pending_review_items(db)
+        digest_content = generate_digest_note(db, today)
+        index_content = generate_index_note(db, today)
+
+    # Stream the pending review note (it grows with the queue)
     review_path = output_path / "reviews" / f"{today}-pending.md"
-    review_path.write_text(review_content)
-    counts["reviews"] = 1
+    if write_parts_if_changed(review_path, iter_pending_review_note(review_items, today)):
+        counts["reviews"] = 1
 
-    # Generate digest note
-    digest_content = generate_digest_note(db)
+    # Write digest note
     digest_path = output_path / "digests" / f"{today}-digest.md"
-    digest_path.write_text(digest_content)
-    counts["digests"] = 1
+    if write_if_changed(digest_path, digest_content):
+        counts["digests"] = 1
 
-    # Generate index note
-    index_content = generate_index_note(db)
+    # Write index note
     index_path = output_path / "index.md"
-    index_path.write_text(index_content)
-    counts["index"] = 1
+    if write_if_changed(index_path, index_content):
+        counts["index"] = 1
 
     return counts
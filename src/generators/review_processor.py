@@ -1,15 +1,34 @@
 """Process review decisions from Obsidian markdown files."""
 
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Iterator
+from uuid import uuid4
+import json
+import logging
+import os
 import shutil
 
 from src.db.database import Database
 from src.config import ObsidianConfig
 
+logger = logging.getLogger(__name__)
+
+# Review note parsing patterns, compiled once
+_RULE_HEADER_RE = re.compile(r"## Rule (\d+):")
+# Run only on a checked line that already matched its option text
+_EDIT_CAPTURE_RE = re.compile(r"`([^`]+)`")
+_REASON_CAPTURE_RE = re.compile(r"\(reason:\s*([^)]+)\)", re.IGNORECASE)
+
+# parse_review_file states for the proposed-rule blockquote
+_QUOTE_PENDING, _QUOTE_READING, _QUOTE_DONE = range(3)
+
+# Threads reading and parsing review files concurrently
+PARSE_WORKERS = 8
+
 
 @dataclass
 class ReviewDecision:
@@ -30,161 +49,217 @@ def parse_review_file(file_path: Path) -> list[ReviewDecision]:
     - [x] Approve with edits: `edited rule here`
     - [x] Reject (reason: some reason)
     - [x] Need more evidence
+
+    Single pass over the lines: a "## Rule N:" heading starts a section,
+    which runs until the next rule or a top-level "# " category heading.
     """
     content = file_path.read_text()
     decisions = []
 
-    # Split by rule sections
-    rule_pattern = r"## Rule (\d+):\s*(.+?)(?=\n##|\Z)"
-    rule_matches = re.finditer(rule_pattern, content, re.DOTALL)
+    rule_index: int | None = None
+    proposed_lines: list[str] = []
+    checked_lines: list[str] = []
+    # Proposed rule blockquote: not seen yet / being read / done
+    quote_state = _QUOTE_PENDING
+
+    for line in content.splitlines():
+        is_rule_heading = line.startswith("## Rule ")
+        if is_rule_heading or line.startswith("# "):
+            # Section boundary: emit the previous rule's decision
+            if rule_index is not None:
+                decision = _build_decision(rule_index, proposed_lines, checked_lines)
+                if decision:
+                    decisions.append(decision)
+
+            header_match = _RULE_HEADER_RE.match(line) if is_rule_heading else None
+            rule_index = int(header_match.group(1)) if header_match else None
+            proposed_lines, checked_lines = [], []
+            quote_state = _QUOTE_PENDING
+            continue
 
-    for match in rule_matches:
-        rule_index = int(match.group(1))
-        section = match.group(2)
+        if rule_index is None:
+            continue
 
-        # Extract the proposed rule (in blockquote)
-        rule_match = re.search(r">\s*(.+?)(?:\n\n|\n###)", section, re.DOTALL)
-        proposed_rule = rule_match.group(1).strip() if rule_match else ""
+        # The proposed rule is the first blockquote before any ### heading,
+        # running until a blank line (later quotes are evidence)
+        if quote_state == _QUOTE_READING:
+            if not line.strip() or line.startswith("###"):
+                quote_state = _QUOTE_DONE
+            else:
+                proposed_lines.append(line)
+                continue
+        elif quote_state == _QUOTE_PENDING:
+            if line.startswith(">"):
+                proposed_lines.append(line[1:])
+                quote_state = _QUOTE_READING
+                continue
+            if line.startswith("###"):
+                quote_state = _QUOTE_DONE
+
+        if "[x]" in line.lower():
+            checked_lines.append(line)
+
+    if rule_index is not None:
+        decision = _build_decision(rule_index, proposed_lines, checked_lines)
+        if decision:
+            decisions.append(decision)
 
-        # Look for checked decisions
-        decision = None
-        edited_rule = None
-        reject_reason = None
+    return decisions
 
-        # Check for "Approve as written"
-        if re.search(r"\[x\]\s*Approve\s+as\s+written", section, re.IGNORECASE):
-            decision = "approve"
 
-        # Check for "Approve with edits"
-        edit_match = re.search(
-            r"\[x\]\s*Approve\s+with\s+edits:\s*`([^`]+)`",
-            section,
-            re.IGNORECASE,
-        )
-        if edit_match:
-            decision = "approve_edited"
-            edited_rule = edit_match.group(1).strip()
-
-        # Check for "Reject"
-        reject_match = re.search(
-            r"\[x\]\s*Reject\s*\(reason:\s*([^)]+)\)",
-            section,
-            re.IGNORECASE,
-        )
-        if reject_match:
-            decision = "reject"
-            reject_reason = reject_match.group(1).strip()
+def _build_decision(
+    rule_index: int,
+    proposed_lines: list[str],
+    checked_lines: list[str],
+) -> ReviewDecision | None:
+    """Build the decision for one rule section from its checked lines."""
+    approve = need_more = False
+    edited_rule = None
+    reject_reason = None
+
+    for line in checked_lines:
+        line_lower = line.lower()
+        if "approve as written" in line_lower:
+            approve = True
+        elif "approve with edits:" in line_lower:
+            edit_match = _EDIT_CAPTURE_RE.search(line)
+            if edit_match and edited_rule is None:
+                edited_rule = edit_match.group(1).strip()
+        elif "reject (reason:" in line_lower:
+            reject_match = _REASON_CAPTURE_RE.search(line)
+            if reject_match and reject_reason is None:
+                reject_reason = reject_match.group(1).strip()
+        elif "need more evidence" in line_lower:
+            need_more = True
+
+    # Same precedence as before if several boxes are ticked
+    if need_more:
+        decision = "need_more"
+    elif reject_reason is not None:
+        decision = "reject"
+    elif edited_rule is not None:
+        decision = "approve_edited"
+    elif approve:
+        decision = "approve"
+    else:
+        return None
+
+    return ReviewDecision(
+        rule_index=rule_index,
+        proposed_rule="\n".join(proposed_lines).strip(),
+        decision=decision,
+        edited_rule=edited_rule,
+        reject_reason=reject_reason,
+    )
 
-        # Check for "Need more evidence"
-        if re.search(r"\[x\]\s*Need\s+more\s+evidence", section, re.IGNORECASE):
-            decision = "need_more"
 
-        if decision:
-            decisions.append(
-                ReviewDecision(
-                    rule_index=rule_index,
-                    proposed_rule=proposed_rule,
-                    decision=decision,
-                    edited_rule=edited_rule,
-                    reject_reason=reject_reason,
-                )
-            )
+# learned_rules source for decisions that create a rule
+DECISION_SOURCES = {"approve": "review", "approve_edited": "review_edited"}
 
-    return decisions
+# review_queue status each decision moves its item to
+DECISION_STATUSES = {
+    "approve": "approved",
+    "approve_edited": "approved",
+    "reject": "rejected",
+    "need_more": "needs_evidence",
+}
 
 
-def apply_decision(db: Database, decision: ReviewDecision) -> bool:
-    """Apply a review decision to the database.
-
-    Returns True if successful.
+def apply_decisions(
+    db: Database,
+    decisions: list[ReviewDecision],
+    now: str | None = None,
+) -> list[ReviewDecision]:
+    """Apply review decisions to the database in one transaction.
+
+    Rule inserts and status updates are each issued as a single
+    executemany. now is the ISO timestamp stamped on every row; defaults
+    to the current time. Returns the decisions that were applied.
     """
-    now = datetime.utcnow().isoformat()
+    if now is None:
+        now = datetime.utcnow().isoformat()
 
-    if decision.decision == "approve":
-        # Add to learned_rules
-        db.execute(
-            """
-            INSERT INTO learned_rules
-            (id, rule_text, source, active, created_at, approved_at)
-            VALUES (?, ?, 'review', 1, ?, ?)
-            """,
-            (
-                f"rule-{decision.rule_index}-{now[:10]}",
-                decision.proposed_rule,
-                now,
-                now,
-            ),
-        )
+    rule_rows = []
+    status_rows = []
+    applied = []
 
-        # Update review queue status
-        db.execute(
-            """
-            UPDATE review_queue
-            SET status = 'approved', reviewed_at = ?
-            WHERE proposed_rule = ?
-            """,
-            (now, decision.proposed_rule),
-        )
+    for decision in decisions:
+        status = DECISION_STATUSES.get(decision.decision)
+        if status is None:
+            continue
 
-        return True
+        source = DECISION_SOURCES.get(decision.decision)
+        if source:
+            if decision.decision == "approve_edited":
+                rule_text = decision.edited_rule or decision.proposed_rule
+            else:
+                rule_text = decision.proposed_rule
+            rule_rows.append(
+                (f"rule-{uuid4().hex[:16]}", rule_text, source, now, now)
+            )
 
-    elif decision.decision == "approve_edited":
-        # Add edited rule to learned_rules
-        rule_text = decision.edited_rule or decision.proposed_rule
+        status_rows.append((status, now, decision.proposed_rule))
+        applied.append(decision)
 
-        db.execute(
-            """
-            INSERT INTO learned_rules
-            (id, rule_text, source, active, created_at, approved_at)
-            VALUES (?, ?, 'review_edited', 1, ?, ?)
-            """,
-            (
-                f"rule-{decision.rule_index}-{now[:10]}",
-                rule_text,
-                now,
-                now,
-            ),
-        )
+    if not applied:
+        return applied
+
+    with db.transaction() as cursor:
+        if rule_rows:
+            # Add to learned_rules
+            cursor.executemany(
+                """
+                INSERT INTO learned_rules
+                (id, rule_text, source, active, created_at, approved_at)
+                VALUES (?, ?, ?, 1, ?, ?)
+                """,
+                rule_rows,
+            )
 
         # Update review queue status
-        db.execute(
+        cursor.executemany(
             """
             UPDATE review_queue
-            SET status = 'approved', reviewed_at = ?
+            SET status = ?, reviewed_at = ?
             WHERE proposed_rule = ?
             """,
-            (now, decision.proposed_rule),
+            status_rows,
         )
 
-        return True
+    return applied
 
-    elif decision.decision == "reject":
-        # Mark as rejected
-        db.execute(
-            """
-            UPDATE review_queue
-            SET status = 'rejected', reviewed_at = ?
-            WHERE proposed_rule = ?
-            """,
-            (now, decision.proposed_rule),
-        )
 
-        return True
+def apply_decision(db: Database, decision: ReviewDecision, now: str | None = None) -> bool:
+    """Apply a review decision to the database.
 
-    elif decision.decision == "need_more":
-        # Keep in queue but mark as needing more
-        db.execute(
-            """
-            UPDATE review_queue
-            SET status = 'needs_evidence', reviewed_at = ?
-            WHERE proposed_rule = ?
-            """,
-            (now, decision.proposed_rule),
-        )
+    Returns True if successful.
+    """
+    return bool(apply_decisions(db, [decision], now))
+
+
+def list_pending_review_files(reviews_path: Path) -> list[Path]:
+    """List *-pending.md review files (not hidden, not directories).
+
+    Uses os.scandir, whose entries carry the file type from the directory
+    read, so no per-file stat is needed.
+    """
+    with os.scandir(reviews_path) as entries:
+        return [
+            Path(entry.path)
+            for entry in entries
+            if entry.name.endswith("-pending.md")
+            and entry.name[0] != "."
+            and entry.is_file()
+        ]
 
-        return True
 
-    return False
+def _parse_review_file_safe(file_path: Path) -> list[ReviewDecision] | None:
+    """Parse a review file, logging and returning None if it cannot be read."""
+    try:
+        return parse_review_file(file_path)
+    except Exception as e:
+        logger.error(f"Failed to parse {file_path.name}: {e}")
+        return None
 
 
 def process_review_files(db: Database, config: ObsidianConfig) -> dict[str, int]:
@@ -195,39 +270,60 @@ def process_review_files(db: Database, config: ObsidianConfig) -> dict[str, int]
     reviews_path = config.output_path / "reviews"
     archive_path = config.output_path / "archive"
 
+    counts = {"processed": 0, "approved": 0, "rejected": 0, "need_more": 0, "failed": 0}
     if not reviews_path.exists():
-        return {"processed": 0, "approved": 0, "rejected": 0, "pending": 0}
+        return counts
+
+    # Read and parse all pending review files concurrently (file I/O
+    # only; the DB is written from this thread afterwards)
+    review_files = list_pending_review_files(reviews_path)
+    if not review_files:
+        return counts
+    with ThreadPoolExecutor(max_workers=min(PARSE_WORKERS, len(review_files))) as executor:
+        parsed = list(zip(review_files, executor.map(_parse_review_file_safe, review_files)))
 
-    counts = {"processed": 0, "approved": 0, "rejected": 0, "need_more": 0}
+    # One timestamp for the whole batch
+    now = datetime.utcnow().isoformat()
+    created_dirs: set[str] = set()
 
-    # Find all pending review files
-    for review_file in reviews_path.glob("*-pending.md"):
-        decisions = parse_review_file(review_file)
+    for review_file, file_decisions in parsed:
+        if file_decisions is None:
+            counts["failed"] += 1
+            continue
+        if not file_decisions:
+            continue
 
-        if not decisions:
+        # One transaction per file, so a failing file leaves the others applied
+        try:
+            applied = apply_decisions(db, file_decisions, now)
+        except Exception as e:
+            counts["failed"] += 1
+            logger.error(f"Failed to apply decisions from {review_file.name}: {e}")
             continue
 
-        for decision in decisions:
-            success = apply_decision(db, decision)
-            if success:
-                counts["processed"] += 1
-                if decision.decision in ("approve", "approve_edited"):
-                    counts["approved"] += 1
-                elif decision.decision == "reject":
-                    counts["rejected"] += 1
-                elif decision.decision == "need_more":
-                    counts["need_more"] += 1
-
-        # If any decisions were processed, archive the file
-        if decisions:
-            # Get year-month for archive folder
-            year_month = review_file.stem[:7]  # e.g., "2025-12"
-            archive_subdir = archive_path / year_month
+        for decision in applied:
+            counts["processed"] += 1
+            if decision.decision in ("approve", "approve_edited"):
+                counts["approved"] += 1
+            elif decision.decision == "reject":
+                counts["rejected"] += 1
+            elif decision.decision == "need_more":
+                counts["need_more"] += 1
+
+        # Archive the file only once its decisions are committed
+        year_month = review_file.stem[:7]  # e.g., "2025-12"
+        archive_subdir = archive_path / year_month
+        if year_month not in created_dirs:
             archive_subdir.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(year_month)
 
-            # Move to archive with processed suffix
-            archive_name = review_file.stem + "-processed.md"
-            shutil.move(str(review_file), str(archive_subdir / archive_name))
+        # Move to archive with processed suffix; a plain rename unless
+        # the archive is on another filesystem
+        archive_file = archive_subdir / (review_file.stem + "-processed.md")
+        try:
+            os.replace(review_file, archive_file)
+        except OSError:
+            shutil.move(str(review_file), str(archive_file))
 
     return counts
 
@@ -253,49 +349,49 @@ def add_to_review_queue(
 
     Returns the review item ID.
     """
-    import uuid
-    import json
-
     now = datetime.utcnow().isoformat()
-    review_id = str(uuid.uuid4())[:16]
-
-    db.execute(
-        """
-        INSERT INTO review_queue
-        (id, rule_type, proposed_rule, file_types, project_scope, confidence, status, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)
-        """,
-        (
-            review_id,
-            rule_type,
-            proposed_rule,
-            json.dumps(file_types) if file_types else None,
-            project_scope,
-            confidence,
-            now,
-        ),
-    )
+    review_id = uuid4().hex[:16]
+
+    with db.transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO review_queue
+            (id, rule_type, proposed_rule, file_types, project_scope, confidence, status,
+             created_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)
+            """,
+            (
+                review_id,
+                rule_type,
+                proposed_rule,
+                json.dumps(file_types) if file_types else None,
+                project_scope,
+                confidence,
+                now,
+            ),
+        )
 
-    # Add evidence
-    if evidence:
-        for ev in evidence:
-            ev_id = str(uuid.uuid4())[:16]
-            db.execute(
+        # Add evidence
+        if evidence:
+            cursor.executemany(
                 """
                 INSERT INTO review_evidence
                 (id, review_id, conversation_id, project_path, timestamp,
                  trigger_message, evidence_type)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                (
-                    ev_id,
-                    review_id,
-                    ev.get("conversation_id"),
-                    ev.get("project_path"),
-                    ev.get("timestamp"),
-                    ev.get("message"),
-                    ev.get("type", "explicit"),
-                ),
+                [
+                    (
+                        uuid4().hex[:16],
+                        review_id,
+                        ev.get("conversation_id"),
+                        ev.get("project_path"),
+                        ev.get("timestamp"),
+                        ev.get("message"),
+                        ev.get("type", "explicit"),
+                    )
+                    for ev in evidence
+                ],
             )
 
     return review_id
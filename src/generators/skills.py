@@ -1,12 +1,18 @@
 """Skill generator for auto-creating .claude/skills/ from workflow patterns."""
 
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import TypedDict
 import json
+import os
 import re
+import sys
 
 from src.db.database import Database
+from src.generators.fileio import GENERATED_MARKER, atomic_write
 
 
 @dataclass
@@ -22,8 +28,17 @@ class SkillCandidate:
     project_scope: str | None = None
 
 
+class WorkflowPattern(TypedDict):
+    """A workflow that suggests a skill, with its trigger regexes."""
+
+    name: str
+    triggers: list[str]
+    keywords: tuple[str, ...]
+    description: str
+
+
 # Workflow patterns that suggest skills
-WORKFLOW_PATTERNS = [
+WORKFLOW_PATTERNS: list[WorkflowPattern] = [
     {
         "name": "task-workflow",
         "triggers": [
@@ -31,6 +46,8 @@ WORKFLOW_PATTERNS = [
             r"(?i)create.*branch.*push",
             r"(?i)implement.*test.*push",
         ],
+        # Lower-case substrings at least one of which every trigger needs
+        "keywords": ("branch", "implement"),
         "description": "Use when starting any development task that involves code changes",
     },
     {
@@ -40,6 +57,7 @@ WORKFLOW_PATTERNS = [
             r"(?i)don'?t.*git\s+add\s+\.",
             r"(?i)specify.*files.*explicitly",
         ],
+        "keywords": ("git", "specify"),
         "description": "Use when committing changes - ensures safe git practices",
     },
     {
@@ -49,6 +67,7 @@ WORKFLOW_PATTERNS = [
             r"(?i)tests.*must.*pass",
             r"(?i)verify.*tests.*push",
         ],
+        "keywords": ("test",),
         "description": "Use before committing - ensures tests pass first",
     },
     {
@@ -58,10 +77,48 @@ WORKFLOW_PATTERNS = [
             r"(?i)uv.*instead.*pip",
             r"(?i)python.*projects?.*uv",
         ],
+        "keywords": ("uv",),
         "description": "Use when setting up Python projects - ensures correct tooling",
     },
 ]
 
+# Threads stat-ing project directories in update_all_skills
+EXISTS_CHECK_WORKERS = 16
+
+
+def _scoped(pattern: str) -> str:
+    """Wrap a pattern so it can be joined into an alternation.
+
+    A leading global "(?i)" is only valid at the very start of a regex,
+    so it becomes a scoped "(?i:...)" group.
+    """
+    if pattern.startswith("(?i)"):
+        return f"(?i:{pattern[4:]})"
+    return f"(?:{pattern})"
+
+
+# Each workflow pattern's triggers fused into one regex, keyed by name
+_TRIGGER_RES: dict[str, re.Pattern[str]] = {
+    pattern["name"]: re.compile("|".join(_scoped(t) for t in pattern["triggers"]))
+    for pattern in WORKFLOW_PATTERNS
+}
+
+# Common step patterns, in the order steps are listed
+STEP_PATTERNS = [
+    r"(?i)(create|make).*branch",
+    r"(?i)run.*test",
+    r"(?i)commit.*change",
+    r"(?i)push.*remote",
+    r"(?i)verify.*pass",
+]
+
+# All step patterns fused into one regex. Each is a lookahead in group
+# _<i>, so finditer reports every position where any pattern matches
+# (overlapping matches included) in a single scan per message.
+_STEP_RE = re.compile(
+    "|".join(f"(?=(?P<_{i}>{_scoped(p)}))" for i, p in enumerate(STEP_PATTERNS))
+)
+
 
 def detect_workflow_patterns(
     db: Database,
@@ -71,39 +128,43 @@ def detect_workflow_patterns(
 
     Returns skill candidates that appear multiple times.
     """
-    # Get all rules and corrections
-    rules = db.fetchall(
+    matches_by_pattern: dict[str, list[tuple[str, float, str | None]]] = {
+        pattern["name"]: [] for pattern in WORKFLOW_PATTERNS
+    }
+
+    # Stream approved rules and corrections in one pass, testing each
+    # row against every pattern while it is in hand
+    for rule_text, confidence, project_scope in db.iter_rows(
         """
         SELECT proposed_rule, confidence, project_scope
         FROM review_queue
         WHERE status = 'approved'
-        """
-    )
-
-    corrections = db.fetchall(
-        """
-        SELECT extracted_rule, confidence
+        UNION ALL
+        SELECT extracted_rule, confidence, NULL
         FROM corrections
         WHERE reviewed = 1 AND approved = 1
         """
-    )
+    ):
+        if not rule_text:
+            continue
 
-    # Combine all evidence
-    all_rules = [(r[0], r[1], r[2]) for r in rules] + [(c[0], c[1], None) for c in corrections]
+        # Lower-cased once for the keyword pre-filter
+        rule_lower = rule_text.lower()
 
-    candidates: dict[str, SkillCandidate] = {}
+        for pattern in WORKFLOW_PATTERNS:
+            # Cheap substring check before running the regex
+            if not any(k in rule_lower for k in pattern["keywords"]):
+                continue
 
-    for pattern in WORKFLOW_PATTERNS:
-        matches = []
+            if _TRIGGER_RES[pattern["name"]].search(rule_text):
+                matches_by_pattern[pattern["name"]].append(
+                    (rule_text, confidence, project_scope)
+                )
 
-        for rule_text, confidence, project_scope in all_rules:
-            if not rule_text:
-                continue
+    candidates: dict[str, SkillCandidate] = {}
 
-            for trigger in pattern["triggers"]:
-                if re.search(trigger, rule_text):
-                    matches.append((rule_text, confidence, project_scope))
-                    break
+    for pattern in WORKFLOW_PATTERNS:
+        matches = matches_by_pattern[pattern["name"]]
 
         if len(matches) >= min_occurrences:
             # Aggregate evidence
@@ -111,7 +172,7 @@ def detect_workflow_patterns(
             avg_confidence = sum(m[1] for m in matches) / len(matches)
 
             # Determine scope (global if mixed, else project-specific)
-            scopes = set(m[2] for m in matches if m[2])
+            scopes = set(_project_key(m[2]) for m in matches if m[2])
             project_scope = list(scopes)[0] if len(scopes) == 1 else None
 
             candidates[pattern["name"]] = SkillCandidate(
@@ -129,122 +190,125 @@ def detect_workflow_patterns(
 
 def extract_steps_from_evidence(evidence: list[str]) -> list[str]:
     """Extract actionable steps from evidence messages."""
-    steps = []
-
-    # Common step patterns
-    step_patterns = [
-        r"(?i)(create|make).*branch",
-        r"(?i)run.*test",
-        r"(?i)commit.*change",
-        r"(?i)push.*remote",
-        r"(?i)verify.*pass",
-    ]
-
-    for pattern in step_patterns:
-        for msg in evidence:
-            if re.search(pattern, msg):
+    # First (leftmost, earliest message) match of each step pattern
+    found: dict[int, str] = {}
+    for msg in evidence:
+        for match in _STEP_RE.finditer(msg):
+            group = match.lastgroup
+            assert group is not None  # every alternative is a named group
+            index = int(group[1:])
+            if index not in found:
                 # Clean and add as step
-                match = re.search(pattern, msg)
-                if match:
-                    steps.append(match.group(0).capitalize())
-                break
-
-    # Deduplicate while preserving order
-    seen = set()
-    unique_steps = []
-    for step in steps:
-        if step.lower() not in seen:
-            seen.add(step.lower())
-            unique_steps.append(step)
-
-    return unique_steps if unique_steps else ["Follow the workflow as described"]
-
-
-def generate_skill_content(candidate: SkillCandidate) -> str:
-    """Generate markdown content for a skill file."""
-    lines = [
-        "---",
-        f"name: {candidate.name}",
-        f"description: {candidate.description}",
-        "---",
-        "",
-        f"# {candidate.name.replace('-', ' ').title()}",
-        "",
-        f"_Auto-generated by claude-reinforcement on {datetime.utcnow().strftime('%Y-%m-%d')}_",
-        "",
-        "## When to Use",
-        "",
-        candidate.trigger,
-        "",
-        "## Steps",
-        "",
-    ]
-
-    for i, step in enumerate(candidate.steps, 1):
-        lines.append(f"{i}. {step}")
-
-    lines.extend([
-        "",
-        "## Evidence",
-        "",
-        "This skill was generated from the following corrections:",
-        "",
-    ])
-
-    for evidence in candidate.evidence:
-        # Truncate long evidence
-        truncated = evidence[:100] + "..." if len(evidence) > 100 else evidence
-        lines.append(f"- {truncated}")
-
-    lines.append("")
-    return "\n".join(lines)
+                found[index] = match.group(group).capitalize()
+        if len(found) == len(STEP_PATTERNS):
+            break
+
+    # Steps are listed in pattern (workflow) order, deduplicated
+    # case-insensitively keeping the first spelling
+    unique_steps: dict[str, str] = {}
+    for i in sorted(found):
+        unique_steps.setdefault(found[i].lower(), found[i])
+
+    return list(unique_steps.values()) or ["Follow the workflow as described"]
+
+
+def generate_skill_content(candidate: SkillCandidate, today: str | None = None) -> str:
+    """Generate markdown content for a skill file.
+
+    today is the YYYY-MM-DD date for the header; defaults to the current date.
+    """
+    if today is None:
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+    title = candidate.name.replace("-", " ").title()
+
+    steps = "".join(f"{i}. {step}\n" for i, step in enumerate(candidate.steps, 1))
+    # Truncate long evidence
+    evidence = "".join(
+        f"- {e[:100]}...\n" if len(e) > 100 else f"- {e}\n" for e in candidate.evidence
+    )
+
+    return (
+        f"---\nname: {candidate.name}\ndescription: {candidate.description}\n---\n\n"
+        f"# {title}\n\n"
+        f"_Auto-generated by claude-reinforcement on {today}_\n\n"
+        f"## When to Use\n\n{candidate.trigger}\n\n"
+        f"## Steps\n\n{steps}\n"
+        "## Evidence\n\n"
+        f"This skill was generated from the following corrections:\n\n{evidence}"
+    )
 
 
 def write_skill_file(
     candidate: SkillCandidate,
     output_dir: Path,
+    today: str | None = None,
 ) -> bool:
     """Write a skill file to the output directory.
 
-    Returns True if file was written.
+    Returns True if file was written; unchanged files are not rewritten.
     """
     output_dir.mkdir(parents=True, exist_ok=True)
 
     file_path = output_dir / f"{candidate.name}.md"
 
+    # Read once for both the manual-skill check and the comparison
+    try:
+        existing = file_path.read_bytes()
+    except FileNotFoundError:
+        existing = None
+
     # Don't overwrite manually created skills
-    if file_path.exists():
-        existing = file_path.read_text()
-        if "Auto-generated by claude-reinforcement" not in existing:
-            return False
+    if existing is not None and GENERATED_MARKER not in existing:
+        return False
 
-    content = generate_skill_content(candidate)
-    file_path.write_text(content)
+    content = generate_skill_content(candidate, today).encode()
+    if content == existing:
+        return False
+
+    atomic_write(file_path, content)
     return True
 
 
+def _project_key(path: str) -> str:
+    """Normalized, interned form of a project path for scope comparison."""
+    return sys.intern(os.path.normpath(path))
+
+
+def _write_candidates(
+    candidates: list[SkillCandidate],
+    skills_dir: Path,
+    filter_fn: Callable[[SkillCandidate], bool],
+) -> int:
+    """Write the candidates accepted by filter_fn. Returns count written."""
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    written = 0
+    for candidate in candidates:
+        if filter_fn(candidate) and write_skill_file(candidate, skills_dir, today):
+            written += 1
+    return written
+
+
 def generate_skills_for_project(
     db: Database,
     project_path: Path,
     min_occurrences: int = 2,
+    candidates: list[SkillCandidate] | None = None,
 ) -> dict[str, int]:
     """Generate skill files for a project.
 
+    Pass precomputed candidates to skip pattern detection.
     Returns count of skills written.
     """
-    candidates = detect_workflow_patterns(db, min_occurrences)
-
-    skills_dir = project_path / ".claude" / "skills"
-    written = 0
-
-    for candidate in candidates:
-        # Filter by project scope if applicable
-        if candidate.project_scope and candidate.project_scope != str(project_path):
-            continue
-
-        if write_skill_file(candidate, skills_dir):
-            written += 1
-
+    if candidates is None:
+        candidates = detect_workflow_patterns(db, min_occurrences)
+
+    # Global skills plus those scoped to this project
+    project_key = _project_key(str(project_path))
+    written = _write_candidates(
+        candidates,
+        project_path / ".claude" / "skills",
+        lambda c: not c.project_scope or c.project_scope == project_key,
+    )
     return {"skills": written}
 
 
@@ -252,24 +316,20 @@ def generate_global_skills(
     db: Database,
     claude_dir: Path,
     min_occurrences: int = 2,
+    candidates: list[SkillCandidate] | None = None,
 ) -> dict[str, int]:
     """Generate global skill files.
 
+    Pass precomputed candidates to skip pattern detection.
     Returns count of skills written.
     """
-    candidates = detect_workflow_patterns(db, min_occurrences)
-
-    skills_dir = claude_dir / "skills"
-    written = 0
-
-    for candidate in candidates:
-        # Only write global skills (no project scope)
-        if candidate.project_scope:
-            continue
-
-        if write_skill_file(candidate, skills_dir):
-            written += 1
+    if candidates is None:
+        candidates = detect_workflow_patterns(db, min_occurrences)
 
+    # Only write global skills (no project scope)
+    written = _write_candidates(
+        candidates, claude_dir / "skills", lambda c: not c.project_scope
+    )
     return {"skills": written}
 
 
@@ -285,23 +345,34 @@ def update_all_skills(
     """
     counts = {"global_skills": 0, "project_skills": 0}
 
+    # Detect once; every target only filters the same candidates
+    candidates = detect_workflow_patterns(db, min_occurrences)
+
     # Generate global skills
-    result = generate_global_skills(db, global_claude_dir, min_occurrences)
+    result = generate_global_skills(db, global_claude_dir, min_occurrences, candidates)
     counts["global_skills"] = result["skills"]
 
     # Generate project-specific skills
     if project_paths:
         for project_path in project_paths:
-            result = generate_skills_for_project(db, project_path, min_occurrences)
+            result = generate_skills_for_project(
+                db, project_path, min_occurrences, candidates
+            )
             counts["project_skills"] += result["skills"]
     else:
-        results = db.fetchall(
-            "SELECT DISTINCT project_path FROM conversations"
-        )
-        for (project_path_str,) in results:
-            project_path = Path(project_path_str)
-            if project_path.exists():
-                result = generate_skills_for_project(db, project_path, min_occurrences)
+        path_strs = [
+            row[0] for row in db.iter_rows("SELECT DISTINCT project_path FROM conversations")
+        ]
+        # Stat all project dirs concurrently instead of one at a time
+        workers = min(EXISTS_CHECK_WORKERS, len(path_strs)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            existing = list(executor.map(os.path.isdir, path_strs))
+
+        for project_path_str, exists in zip(path_strs, existing):
+            if exists:
+                result = generate_skills_for_project(
+                    db, Path(project_path_str), min_occurrences, candidates
+                )
                 counts["project_skills"] += result["skills"]
 
     return counts
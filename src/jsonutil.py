@@ -0,0 +1,14 @@
+"""JSON decoding that uses orjson when the optional "fast" extra is installed."""
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+json_loads: Callable[[str | bytes], Any]
+
+try:
+    import orjson
+except ImportError:
+    json_loads = json.loads
+else:
+    json_loads = orjson.loads
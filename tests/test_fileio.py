@@ -0,0 +1,75 @@
+"""Tests for the generator file-writing helpers."""
+
+import os
+import stat
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from src.generators.fileio import atomic_write, write_if_changed, write_parts_if_changed
+
+
+def _mode(path: Path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+@pytest.fixture
+def linked(tmp_path: Path) -> tuple[Path, Path]:
+    """A CLAUDE.md symlink pointing into a separate dotfiles directory."""
+    dotfiles = tmp_path / "dotfiles"
+    dotfiles.mkdir()
+    real = dotfiles / "CLAUDE.md"
+    real.write_text("old\n")
+    link = tmp_path / "CLAUDE.md"
+    link.symlink_to(real)
+    return link, real
+
+
+def test_atomic_write_creates_file(tmp_path: Path) -> None:
+    path = tmp_path / "new.md"
+    atomic_write(path, b"hello\n")
+    assert path.read_bytes() == b"hello\n"
+    assert not (tmp_path / "new.md.tmp").exists()
+
+
+def test_atomic_write_follows_symlink(linked: tuple[Path, Path]) -> None:
+    link, real = linked
+    atomic_write(link, b"new\n")
+    assert link.is_symlink()
+    assert real.read_bytes() == b"new\n"
+
+
+def test_write_if_changed_follows_symlink(linked: tuple[Path, Path]) -> None:
+    link, real = linked
+    assert write_if_changed(link, "new\n")
+    assert link.is_symlink()
+    assert real.read_text() == "new\n"
+    assert not write_if_changed(link, "new\n")
+
+
+def test_write_parts_if_changed_follows_symlink(linked: tuple[Path, Path]) -> None:
+    link, real = linked
+    assert write_parts_if_changed(link, ["n", "ew\n"])
+    assert link.is_symlink()
+    assert real.read_text() == "new\n"
+    assert not write_parts_if_changed(link, ["new\n"])
+    assert not (real.parent / "CLAUDE.md.tmp").exists()
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda p: atomic_write(p, b"new\n"),
+        lambda p: write_if_changed(p, "new\n"),
+        lambda p: write_parts_if_changed(p, ["new\n"]),
+    ],
+    ids=["atomic_write", "write_if_changed", "write_parts_if_changed"],
+)
+def test_writes_keep_existing_mode(tmp_path: Path, write: Callable[[Path], object]) -> None:
+    path = tmp_path / "notes.md"
+    path.write_text("old\n")
+    os.chmod(path, 0o600)
+    write(path)
+    assert path.read_text() == "new\n"
+    assert _mode(path) == 0o600
@@ -0,0 +1,127 @@
+"""Tests for parsing decisions out of pending review notes."""
+
+from pathlib import Path
+
+import pytest
+
+from src.generators.obsidian import ReviewItem, iter_pending_review_note
+from src.generators.review_processor import parse_review_file
+
+APPROVE = "- [ ] Approve as written"
+EDIT = "- [ ] Approve with edits: `___`"
+REJECT = "- [ ] Reject (reason: ___)"
+NEED_MORE = "- [ ] Need more evidence"
+
+
+def _item(rule_type: str, proposed_rule: str) -> ReviewItem:
+    return ReviewItem(
+        id=proposed_rule[:8],
+        rule_type=rule_type,
+        proposed_rule=proposed_rule,
+        file_types=[".py"],
+        project_scope=None,
+        confidence=0.7,
+        evidence=[
+            {
+                "project_path": "/home/me/proj",
+                "timestamp": "2025-12-01T10:00:00",
+                "message": "quoted evidence, not the rule",
+            }
+        ],
+        status="pending",
+        created_at="2025-12-01",
+    )
+
+
+def _tick(note: str, rule_index: int, box: str, ticked: str) -> str:
+    """Replace one checkbox inside the given rule's section only."""
+    start = note.index(f"## Rule {rule_index}:")
+    end = note.find("## Rule ", start + 1)
+    end = len(note) if end < 0 else end
+    section = note[start:end].replace(box, ticked, 1)
+    return note[:start] + section + note[end:]
+
+
+def _write_note(tmp_path: Path, items: list[ReviewItem], ticks: list[tuple[int, str, str]]) -> Path:
+    note = "".join(iter_pending_review_note(items, "2025-12-02"))
+    for rule_index, box, ticked in ticks:
+        note = _tick(note, rule_index, box, ticked)
+    path = tmp_path / "2025-12-02-pending.md"
+    path.write_text(note)
+    return path
+
+
+@pytest.fixture
+def items() -> list[ReviewItem]:
+    # Two categories, so a "# " category heading sits between rules 2 and 3
+    return [
+        _item("workflow", "Use -> arrows in diagrams\nand keep them short"),
+        _item("workflow", "Create a branch before editing"),
+        _item("testing", "Run the tests before committing"),
+        _item("testing", "Prefer pytest fixtures"),
+        _item("testing", "Left untouched"),
+    ]
+
+
+def test_untouched_note_has_no_decisions(tmp_path: Path, items: list[ReviewItem]) -> None:
+    assert parse_review_file(_write_note(tmp_path, items, [])) == []
+
+
+def test_each_checkbox_is_parsed(tmp_path: Path, items: list[ReviewItem]) -> None:
+    path = _write_note(
+        tmp_path,
+        items,
+        [
+            (1, APPROVE, "- [x] Approve as written"),
+            (2, EDIT, "- [x] Approve with edits: `Always create a branch first`"),
+            (3, REJECT, "- [X] Reject (reason: too obvious)"),
+            (4, NEED_MORE, "- [x] Need more evidence"),
+        ],
+    )
+
+    decisions = {d.rule_index: d for d in parse_review_file(path)}
+
+    assert sorted(decisions) == [1, 2, 3, 4]
+
+    assert decisions[1].decision == "approve"
+    # Multi-line proposed rule; "->" in the heading is not a blockquote
+    assert decisions[1].proposed_rule == "Use -> arrows in diagrams\nand keep them short"
+
+    assert decisions[2].decision == "approve_edited"
+    assert decisions[2].proposed_rule == "Create a branch before editing"
+    assert decisions[2].edited_rule == "Always create a branch first"
+
+    assert decisions[3].decision == "reject"
+    assert decisions[3].proposed_rule == "Run the tests before committing"
+    assert decisions[3].reject_reason == "too obvious"
+
+    assert decisions[4].decision == "need_more"
+    assert decisions[4].proposed_rule == "Prefer pytest fixtures"
+
+
+@pytest.mark.parametrize(
+    ("ticks", "expected"),
+    [
+        ([APPROVE, EDIT], "approve_edited"),
+        ([APPROVE, REJECT], "reject"),
+        ([EDIT, REJECT], "reject"),
+        ([APPROVE, EDIT, REJECT, NEED_MORE], "need_more"),
+    ],
+)
+def test_several_ticked_boxes_follow_precedence(
+    tmp_path: Path, items: list[ReviewItem], ticks: list[str], expected: str
+) -> None:
+    filled = {
+        APPROVE: "- [x] Approve as written",
+        EDIT: "- [x] Approve with edits: `edited`",
+        REJECT: "- [x] Reject (reason: no)",
+        NEED_MORE: "- [x] Need more evidence",
+    }
+    # Tick the same boxes in a rule from each category
+    path = _write_note(
+        tmp_path, items, [(rule, box, filled[box]) for rule in (2, 3) for box in ticks]
+    )
+
+    decisions = parse_review_file(path)
+
+    assert [(d.rule_index, d.decision) for d in decisions] == [(2, expected), (3, expected)]